@@ -1,4 +1,16 @@
+import sys
+
+import bench_matrix
+import trace_file
 from program import Program
 
+SUBCOMMANDS = {
+    'matrix': bench_matrix.main,
+    'replay': trace_file.main,
+}
+
 if __name__ == '__main__':
-    Program().main()
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        Program().main()
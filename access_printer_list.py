@@ -1,9 +1,14 @@
 import abc
-import shutil
+import functools
 import sys
 import time
+import typing
 
 import terminal_utils
+from frame_composer import compose_frame
+from frame_profiler import PHASES, FrameStats
+from framebuffer import BACKGROUND_CELL, ColumnFramebuffer
+from output_sink import OutputSink
 from terminal_utils import colorama
 
 
@@ -22,10 +27,86 @@ if terminal_utils.colorama:
     BACKGROUND_COLOR = colorama.Back.BLUE
     FOREGROUND_COLOR = colorama.Fore.BLACK
     SORTED_BG_COLOR = colorama.Back.GREEN
+    AUX_ELEMENT_COLOR = colorama.Back.CYAN
+    # The subcell mode draws the columns with the foreground colors
+    SUBCELL_COLORS = {
+        ELEMENT_COLOR: colorama.Fore.WHITE,
+        ACCESS_ELEMENT_COLOR: colorama.Fore.RED,
+        SORTED_BG_COLOR: colorama.Fore.GREEN,
+        AUX_ELEMENT_COLOR: colorama.Fore.CYAN,
+    }
 
 
 ANSI_ELEMENT_CHAR = '_'
 BACKGROUND_CHAR = ' '
+# Column tops of the subcell mode, from one eighth of a cell to the full one
+SUBCELL_CHARS = '▁▂▃▄▅▆▇█'
+SUBCELL_STEPS = len(SUBCELL_CHARS)
+# The strip of the auxiliary buffer takes this part of the terminal lines
+AUX_STRIP_SHARE = 1 / 4
+
+# Column heights are bounded by the terminal height and there are only a few
+# colors, so the column paints of the whole run fit into the cache
+COLUMN_PAINT_CACHE_SIZE = 1 << 16
+
+(_ALGORITHM_PHASE, _BUILD_PHASE, _RESIZE_PHASE, _WRITE_PHASE,
+ _SLEEP_PHASE) = range(len(PHASES))
+
+
+@functools.lru_cache(maxsize=COLUMN_PAINT_CACHE_SIZE)
+def _get_column_paint(value, previous_value, color):
+    """
+    Returns the escape sequence which repaints a column of previous_value
+    height to a column of value height in the color. The cursor must be at
+    the bottom of the column and returns there
+    """
+    if value >= previous_value:
+        return (color + FOREGROUND_COLOR +
+                colorama.Cursor.UP(value) +
+                (ANSI_ELEMENT_CHAR + colorama.Cursor.BACK() +
+                 colorama.Cursor.DOWN()) * value +
+                BACKGROUND_COLOR)
+    return (BACKGROUND_COLOR +
+            colorama.Cursor.UP(previous_value) +
+            (BACKGROUND_CHAR + colorama.Cursor.BACK() +
+             colorama.Cursor.DOWN()) * (previous_value - value) +
+            color + FOREGROUND_COLOR +
+            (ANSI_ELEMENT_CHAR + colorama.Cursor.BACK() +
+             colorama.Cursor.DOWN()) * value +
+            BACKGROUND_COLOR)
+
+
+@functools.lru_cache(maxsize=COLUMN_PAINT_CACHE_SIZE)
+def _get_subcell_column_paint(value, previous_value, color):
+    """
+    Same as _get_column_paint, but the heights are in eighths of a cell and
+    the column is drawn with the eighth blocks over the background
+    """
+    cells = -(-max(value, previous_value) // SUBCELL_STEPS)
+    if not cells:
+        return ''
+    to_print = (BACKGROUND_COLOR + SUBCELL_COLORS[color] +
+                colorama.Cursor.UP(cells))
+    for cell in range(cells - 1, -1, -1):
+        fill = value - cell * SUBCELL_STEPS
+        if fill > 0:
+            to_print += SUBCELL_CHARS[min(fill, SUBCELL_STEPS) - 1]
+        else:
+            to_print += BACKGROUND_CHAR
+        to_print += colorama.Cursor.BACK() + colorama.Cursor.DOWN()
+    return to_print
+
+
+@functools.lru_cache(maxsize=COLUMN_PAINT_CACHE_SIZE)
+def _get_cursor_shift(shift):
+    """
+    Returns the escape sequence which moves the cursor horizontally
+    """
+    if shift > 0:
+        return colorama.Cursor.FORWARD(shift)
+    elif shift < 0:
+        return colorama.Cursor.BACK(-shift)
+    return ''
 
 
 class AbstractAccessPrinterList(abc.ABC):
@@ -36,37 +117,266 @@ class AbstractAccessPrinterList(abc.ABC):
     class SliceError(Exception):
         def __init__(self):
             super().__init__(
-                f'{AbstractAccessPrinterList.__name__} does not support slices'
+                f'{AbstractAccessPrinterList.__name__} does not support '
+                f'slice assignments which change the length'
             )
 
-    def __init__(self, lst, delay):
+    def __init__(self, lst, delay, fps=None, sink=None, maximum=None,
+                 subcell=False):
         """
         Init list and cashes some list properties
+        :param delay: Delay in seconds after printing one frame
+        :param fps: If set, frames are coalesced and printed at most fps
+        times per second instead of after every access
+        :param sink: OutputSink the frames are written to. By default frames
+        are written to the standard output after every frame
+        :param maximum: Upper bound of the values. By default it's the maximum
+        of the list
+        :param subcell: If set, the column tops are drawn with the eighth
+        blocks, so a cell holds up to 8 values
         """
+        self._sink = sink if sink is not None else OutputSink()
         self.__delay = delay
+        self.__frame_interval = 1 / fps if fps else None
+        self.__pending_frame = ''
+        self.__clock_start = None
+        self.__virtual_time = 0
+        self.__next_tick = 0
+        self.__frame_hooks = []
+        # Times of the phases of the frame being profiled or None if the
+        # frames aren't profiled
+        self.__phase_times = None
+        self.__lap_time = 0
         self._list = lst
         self._length = len(self._list)
-        self._maximum = max(self._list)
-        self.__terminal_size = shutil.get_terminal_size()
+        self._maximum = maximum if maximum is not None else max(self._list)
+        self._cell_height = SUBCELL_STEPS if subcell else 1
+        # Values of the auxiliary buffer, None if there is no buffer
+        self._aux = None
+        self.__resize_watcher = terminal_utils.ResizeWatcher()
+        if not self._sink.is_terminal:
+            # The output size is fixed
+            self.__resize_watcher = None
+        elif not self.__resize_watcher.install():
+            self.__resize_watcher = None
+        self.__terminal_size = self._sink.terminal_size()
+        self._fit_to_terminal(self.__terminal_size)
+        self._first_print()
+
+    def _fit_to_terminal(self, terminal_size):
+        """
+        Sets the visualization geometry for the terminal size:
+        _visible_length is the count of the drawn columns and _rows is the
+        height of the highest column; values are scaled to rows, or to
+        eighths of the rows in the subcell mode, with _height. If there is an
+        auxiliary buffer, _aux_rows lines above the columns are its strip
+        """
+        columns, lines = terminal_size
+        self._visible_length = max(min(self._length, columns - 1), 0)
+        if self._aux is None:
+            self._aux_rows = 0
+            self._aux_visible_length = 0
+        else:
+            self._aux_rows = max(int((lines - 1) * AUX_STRIP_SHARE), 1)
+            self._aux_visible_length = max(min(len(self._aux), columns - 1),
+                                           0)
+        self._rows = max(min(-(-self._maximum // self._cell_height),
+                             lines - 1 - self._aux_rows), 1)
+        self.__scale = self._rows * self._cell_height
+
+    def _height(self, value) -> int:
+        """
+        Returns the drawn height of the column of the value in cells or in
+        eighths of the cells in the subcell mode
+        """
+        return -(-min(max(value, 0), self._maximum) * self.__scale //
+                 self._maximum)
+
+    def _aux_height(self, value) -> int:
+        """
+        Returns the drawn height of the column of the value in the strip of
+        the auxiliary buffer; empty slots aren't drawn
+        """
+        if value is None:
+            return 0
+        scale = self._aux_rows * self._cell_height
+        return -(-min(max(value, 0), self._maximum) * scale // self._maximum)
+
+    def make_aux_buffer(self, length: int) -> 'AuxBuffer':
+        """
+        Returns the auxiliary buffer of the length for the sorting algorithm.
+        Its slots are empty until written and its accesses are visualized
+        in a strip above the columns
+        """
+        self.flush_frames()
+        self._aux = [None] * length
+        self._fit_to_terminal(self.__terminal_size)
         self._first_print()
+        return AuxBuffer(self)
 
-    def _catch_terminal_resizing(self):
+    def _catch_terminal_resizing(self) -> bool:
         """
-        Exits if catches a terminal resizing
+        Catches a terminal resizing and redraws the visualization for the new
+        terminal size
+        :return: True if the terminal was resized
         """
-        if shutil.get_terminal_size() != self.__terminal_size:
-            terminal_utils.clear_terminal()
-            print('Error. Terminal size changed. Execution stopped')
-            sys.exit(1)
+        if self.__resize_watcher is not None:
+            # Only the flag is checked until SIGWINCH is caught
+            if not self.__resize_watcher.pop_resized():
+                return False
+            terminal_size = self._sink.terminal_size()
+        elif not self._sink.is_terminal:
+            return False
+        else:
+            terminal_size = self._sink.terminal_size()
+            if terminal_size == self.__terminal_size:
+                return False
+        self._resize(terminal_size)
+        return True
+
+    def _resize(self, terminal_size):
+        """
+        Redraws the visualization for the new terminal size, which is
+        remembered for the later refits
+        """
+        self.__terminal_size = terminal_size
+        # The pending output was built for the old geometry
+        self.__pending_frame = ''
+        self._sink.flush()
+        self._fit_to_terminal(terminal_size)
+        self._first_print()
 
     def _print_frame(self, frame):
         """
-        Prints the frame of visualization and catches a terminal resizing
+        Prints the frame of visualization and catches a terminal resizing.
+        In the frame coalescing mode the frame is merged into the pending one
+        which is printed only on the next tick.
+        The frame may be a callable which builds the frame string; it's called
+        only when the frame is actually printed
+        """
+        profiling = self.__phase_times is not None
+        if profiling:
+            self.__lap(_BUILD_PHASE)
+        if self.__frame_interval is None:
+            resized = self._catch_terminal_resizing()
+            if profiling:
+                self.__lap(_RESIZE_PHASE)
+            if resized:
+                # The frame was built for the old geometry and the redraw
+                # already shows the current state
+                return
+            frame_bytes = self.__write_frame(frame)
+            # flushing doesn't happen without delay on Mac OS
+            self._sink.sleep(self.__delay)
+            if profiling:
+                self.__call_frame_hooks(frame_bytes)
+            self._on_frame_printed()
+            return
+
+        resized = self._catch_terminal_resizing()
+        if profiling:
+            self.__lap(_RESIZE_PHASE)
+        if resized:
+            return
+        self.__pending_frame = self._merge_frames(self.__pending_frame, frame)
+        if self.__clock_start is None:
+            self.__clock_start = self._sink.time()
+        # Every frame still costs the delay, but only on the virtual clock;
+        # the real sleeping happens once per tick
+        self.__virtual_time += self.__delay
+        now = max(self._sink.time() - self.__clock_start,
+                  self.__virtual_time)
+        if profiling:
+            self.__lap(_BUILD_PHASE)
+        if now >= self.__next_tick:
+            self.__next_tick = now + self.__frame_interval
+            self.flush_frames()
+
+    def flush_frames(self):
+        """
+        Prints the pending coalesced frame, if any, and waits for the real
+        clock to catch up with the virtual one
         """
+        profiling = self.__phase_times is not None
         self._catch_terminal_resizing()
-        print(frame, end='', flush=True)
-        # flushing doesn't happen without delay on Mac OS
-        time.sleep(self.__delay)
+        if profiling:
+            self.__lap(_RESIZE_PHASE)
+        if not self.__pending_frame:
+            return
+        frame = self.__pending_frame
+        self.__pending_frame = ''
+        frame_bytes = self.__write_frame(frame)
+        lag = self.__virtual_time - (self._sink.time() - self.__clock_start)
+        if lag > 0:
+            self._sink.sleep(lag)
+        if profiling:
+            self.__call_frame_hooks(frame_bytes)
+        self._on_frame_printed()
+
+    def __write_frame(self, frame) -> int:
+        """
+        Builds the frame if it's a callable and writes it to the sink
+        :return: Size of the frame in bytes if the frames are profiled
+        """
+        if callable(frame):
+            frame = frame()
+        if self.__phase_times is None:
+            self._sink.write(frame)
+            self._sink.end_frame()
+            return 0
+        self.__lap(_BUILD_PHASE)
+        self._sink.write(frame)
+        self._sink.end_frame()
+        self.__lap(_WRITE_PHASE)
+        return len(frame.encode() if isinstance(frame, str) else frame)
+
+    def add_frame_hook(self, hook: typing.Callable[[FrameStats], None]):
+        """
+        Adds the hook which is called with the FrameStats of every frame
+        printed from now on. The frames are profiled only while there are
+        hooks, so the visualization doesn't pay for the timing otherwise
+        """
+        if self.__phase_times is None:
+            self.__phase_times = [0.0] * len(PHASES)
+            self.__lap_time = time.perf_counter()
+        self.__frame_hooks.append(hook)
+
+    def __lap(self, phase: int):
+        """
+        Adds the time passed since the previous lap to the phase
+        """
+        now = time.perf_counter()
+        self.__phase_times[phase] += now - self.__lap_time
+        self.__lap_time = now
+
+    def __call_frame_hooks(self, frame_bytes: int):
+        self.__lap(_SLEEP_PHASE)
+        stats = FrameStats(*self.__phase_times, frame_bytes)
+        self.__phase_times = [0.0] * len(PHASES)
+        for hook in self.__frame_hooks:
+            hook(stats)
+        # The hooks aren't accounted in any phase
+        self.__lap_time = time.perf_counter()
+
+    def finish(self):
+        """
+        Prints everything still pending, including the output buffer
+        """
+        self.flush_frames()
+        self._sink.flush()
+
+    def _merge_frames(self, pending: str, frame: str) -> str:
+        """
+        Merges the frame into the pending coalesced frame. By default frames
+        are treated as incremental updates and concatenated
+        """
+        return pending + frame
+
+    def _on_frame_printed(self):
+        """
+        Called after a frame has actually been printed
+        """
+        pass
 
     @property
     @abc.abstractmethod
@@ -86,29 +396,73 @@ class AbstractAccessPrinterList(abc.ABC):
     def _bg_color(self) -> str:
         pass
 
+    def _subcell_char(self, fill: int) -> str:
+        """
+        Returns the character of the cell filled with fill eighths in the
+        subcell mode
+        """
+        return SUBCELL_CHARS[fill - 1]
+
+    @property
+    def _cell_glyphs(self) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Returns the (prefix, character) pairs of the cells filled with 0 to
+        _cell_height units; the last character of a cell is its glyph, the
+        rest is the prefix printed where a run of such cells starts
+        """
+        cell_height = self._cell_height
+        if cell_height == 1:
+            element_char = self._element_char
+        else:
+            element_char = self._subcell_char(cell_height)
+        cells = ([self._bg_color + BACKGROUND_CHAR] +
+                 [self._subcell_char(fill) for fill in range(1, cell_height)] +
+                 [element_char])
+        return [(cell[:-1], cell[-1]) for cell in cells]
+
+    @property
+    def _aux_cell_glyphs(self) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Same as _cell_glyphs, but for the strip of the auxiliary buffer
+        """
+        return self._cell_glyphs
+
     def _first_print(self):
         """
         Prints all elements for the first time
         """
-        terminal_utils.clear_terminal()
+        self._sink.clear()
 
         to_print = self._first_print_preface
-        element_char = self._element_char
-        bg_char = self._bg_color + BACKGROUND_CHAR
-
-        for i in range(self._maximum):
-            for j in range(self._length):
-                if self._list[j] >= self._maximum - i:
-                    to_print += element_char
-                else:
-                    to_print += bg_char
-            to_print += self._bg_color + '\n'
+        row_end = (self._bg_color, '\n')
+        if self._aux_rows:
+            aux_heights = [self._aux_height(self._aux[j])
+                           for j in range(self._aux_visible_length)]
+            to_print += compose_frame(aux_heights, self._aux_rows,
+                                      self._cell_height,
+                                      self._aux_cell_glyphs, row_end)
+        heights = [self._height(self._list[j])
+                   for j in range(self._visible_length)]
+        to_print += compose_frame(heights, self._rows, self._cell_height,
+                                  self._cell_glyphs, row_end)
         self._print_frame(to_print)
 
     @abc.abstractmethod
-    def end_of_sort(self):
+    def end_of_sort(self, sweep_step=1):
         """
         Should print sorting completion animation
+        :param sweep_step: Count of the elements the animation advances by
+        in one frame
+        """
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def count_frames(cls, reads: int, writes: int, length: int,
+                     sweep_step=1) -> int:
+        """
+        Should return how many frames are printed for the reads and writes
+        and by end_of_sort of the list of the length
         """
         pass
 
@@ -119,10 +473,20 @@ class AbstractAccessPrinterList(abc.ABC):
         """
         pass
 
+    @abc.abstractmethod
+    def _setslice(self, indices: range, values: typing.List[int]):
+        """
+        Should handle __setitem__ call with a slice; all the items are
+        visualized in one frame
+        """
+        pass
+
     def __setitem__(self, key, value):
+        if self.__phase_times is not None:
+            self.__lap(_ALGORITHM_PHASE)
         if isinstance(key, slice):
-            raise AbstractAccessPrinterList.SliceError
-            # return self.__list.__setitem__(key, value)
+            indices, values = slice_assignment(key, self._length, value)
+            return self._setslice(indices, values)
         return self._setitem(key, value)
 
     @abc.abstractmethod
@@ -132,83 +496,185 @@ class AbstractAccessPrinterList(abc.ABC):
         """
         pass
 
+    @abc.abstractmethod
+    def _getslice(self, indices: range) -> typing.List[int]:
+        """
+        Should handle __getitem__ call with a slice; all the items are
+        visualized in one frame
+        """
+        pass
+
     def __getitem__(self, item):
+        if self.__phase_times is not None:
+            self.__lap(_ALGORITHM_PHASE)
         if isinstance(item, slice):
-            raise AbstractAccessPrinterList.SliceError
+            return self._getslice(range(*item.indices(self._length)))
         return self._getitem(item)
 
+    @abc.abstractmethod
+    def _aux_setslice(self, indices: range, values: typing.List[int]):
+        """
+        Should handle __setitem__ call of the auxiliary buffer; a single
+        item is a slice of one item
+        """
+        pass
+
+    @abc.abstractmethod
+    def _aux_getslice(self, indices: range) -> typing.List[int]:
+        """
+        Should handle __getitem__ call of the auxiliary buffer; a single
+        item is a slice of one item
+        """
+        pass
+
     def __len__(self):
         return self._length
 
 
+def slice_assignment(
+        key: slice, length: int, value: typing.Iterable[int]
+) -> typing.Tuple[range, typing.List[int]]:
+    """
+    Returns the indices and the values of the slice assignment
+    :raise AbstractAccessPrinterList.SliceError: If the assignment would
+    change the length of the list
+    """
+    indices = range(*key.indices(length))
+    values = list(value)
+    if len(values) != len(indices):
+        raise AbstractAccessPrinterList.SliceError
+    return indices, values
+
+
+class AuxBuffer:
+    """
+    Auxiliary buffer of the access printer list. The accesses are
+    visualized by the access printer list like the accesses to its items
+    """
+
+    def __init__(self, access_printer_list: AbstractAccessPrinterList):
+        self.__access_printer_list = access_printer_list
+        self.__length = len(access_printer_list._aux)
+
+    def __indices(self, item) -> range:
+        if isinstance(item, slice):
+            return range(*item.indices(self.__length))
+        if not -self.__length <= item < self.__length:
+            raise IndexError('auxiliary buffer index out of range')
+        item %= self.__length
+        return range(item, item + 1)
+
+    def __getitem__(self, item):
+        values = self.__access_printer_list._aux_getslice(
+            self.__indices(item)
+        )
+        return values if isinstance(item, slice) else values[0]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            indices, values = slice_assignment(key, self.__length, value)
+        else:
+            indices, values = self.__indices(key), [value]
+        self.__access_printer_list._aux_setslice(indices, values)
+
+    def __len__(self):
+        return self.__length
+
+
 # colorama needed
 class ANSIAccessPrinterList(AbstractAccessPrinterList):
-    def __init__(self, lst, delay):
-        self.__last_access_item = None
-        self.__last_access_item_value = None
+    def __init__(self, lst, delay, fps=None, sink=None, maximum=None,
+                 subcell=False):
+        # Items painted with the access color since the last printed frame
+        self.__highlighted = set()
+        # Highlighted items which must be repainted with the element color
+        self.__to_restore = set()
+        # Same for the slots of the auxiliary buffer
+        self.__aux_highlighted = set()
+        self.__aux_to_restore = set()
+        # Column heights as they are currently drawn in the terminal
+        self.__screen_heights = []
+        self.__aux_screen_heights = []
         self.__cursor_pos = 0
         self.__element_color = ELEMENT_COLOR
-        super().__init__(lst, delay)
+        self.__column_paint = (_get_subcell_column_paint if subcell else
+                               _get_column_paint)
+        super().__init__(lst, delay, fps, sink, maximum, subcell)
 
-    def __get_to_print_last_access_item(self):
+    def __get_to_print_restoring(self):
         """
-        Repaints the last accessed element to the element color
+        Repaints the previously accessed elements to the element color
         """
-        if self.__last_access_item is not None:
-            return self.__get_to_print_element(
-                self.__last_access_item,
-                self.__element_color,
-                self.__last_access_item_value
-            )
-        return ''
-
-    def __print_item_setting(self, key):
         to_print = ''
+        for item in self.__to_restore:
+            to_print += self.__get_to_print_element(item, self.__element_color)
+        self.__to_restore.clear()
+        for index in self.__aux_to_restore:
+            to_print += self.__get_to_print_aux_element(index,
+                                                        AUX_ELEMENT_COLOR)
+        self.__aux_to_restore.clear()
+        return to_print
 
-        to_print += self.__get_to_print_element(key, ACCESS_ELEMENT_COLOR)
-        to_print += self.__get_to_print_last_access_item()
+    def __print_items_accessing(self, items):
+        to_print = self.__get_to_print_restoring()
+        for item in items:
+            to_print += self.__get_to_print_element(item,
+                                                    ACCESS_ELEMENT_COLOR)
+            self.__highlighted.add(item)
         self._print_frame(to_print)
-        self.__last_access_item = key
-        self.__last_access_item_value = self._list[key]
-        # self.__last_access_item_value = value
 
-    def __get_to_print_element(self, item, color, previous_value=None):
-        previous_value = previous_value or self._list[item]
-        to_print = ''
-        shift = item - self.__cursor_pos
-        if shift > 0:
-            to_print += colorama.Cursor.FORWARD(shift)
-        elif shift < 0:
-            to_print += colorama.Cursor.BACK(-shift)
-        value = self._list[item]
-
-        if value >= previous_value:
-            to_print += color + FOREGROUND_COLOR
-            to_print += colorama.Cursor.UP(value)
-            to_print += (ANSI_ELEMENT_CHAR + colorama.Cursor.BACK() +
-                         colorama.Cursor.DOWN()) * value
-            to_print += BACKGROUND_COLOR
-        else:
-            to_print += BACKGROUND_COLOR
-            to_print += colorama.Cursor.UP(previous_value)
-            to_print += (BACKGROUND_CHAR + colorama.Cursor.BACK() +
-                         colorama.Cursor.DOWN()) * (previous_value - value)
-            to_print += color + FOREGROUND_COLOR
-            to_print += (ANSI_ELEMENT_CHAR + colorama.Cursor.BACK() +
-                         colorama.Cursor.DOWN()) * value
-            to_print += BACKGROUND_COLOR
-        # to_print += colorama.Cursor.BACK(item)
+    def __get_to_print_element(self, item, color):
+        if item >= self._visible_length:
+            return ''
+        height = self._height(self._list[item])
+        to_print = (_get_cursor_shift(item - self.__cursor_pos) +
+                    self.__column_paint(height,
+                                        self.__screen_heights[item], color))
         self.__cursor_pos = item
+        self.__screen_heights[item] = height
         return to_print
 
-    def __print_item_getting(self, item) -> None:
-        to_print = ''
-
-        to_print += self.__get_to_print_element(item, ACCESS_ELEMENT_COLOR)
-        to_print += self.__get_to_print_last_access_item()
+    def __print_aux_accessing(self, indices):
+        to_print = self.__get_to_print_restoring()
+        for index in indices:
+            to_print += self.__get_to_print_aux_element(index,
+                                                        ACCESS_ELEMENT_COLOR)
+            self.__aux_highlighted.add(index)
         self._print_frame(to_print)
-        self.__last_access_item = item
-        self.__last_access_item_value = None
+
+    def __get_to_print_aux_element(self, index, color):
+        """
+        Repaints the column of the auxiliary buffer slot. The strip ends
+        right above the columns, so the column is painted from there
+        """
+        if index >= self._aux_visible_length:
+            return ''
+        height = self._aux_height(self._aux[index])
+        to_print = (_get_cursor_shift(index - self.__cursor_pos) +
+                    colorama.Cursor.UP(self._rows) +
+                    self.__column_paint(height,
+                                        self.__aux_screen_heights[index],
+                                        color) +
+                    colorama.Cursor.DOWN(self._rows))
+        self.__cursor_pos = index
+        self.__aux_screen_heights[index] = height
+        return to_print
+
+    def _first_print(self):
+        self.__screen_heights = [self._height(self._list[i])
+                                 for i in range(self._visible_length)]
+        self.__aux_screen_heights = [self._aux_height(self._aux[i])
+                                     for i in range(self._aux_visible_length)]
+        self.__cursor_pos = 0
+        self.__to_restore.clear()
+        self.__aux_to_restore.clear()
+        super()._first_print()
+
+    def _on_frame_printed(self):
+        self.__to_restore |= self.__highlighted
+        self.__highlighted.clear()
+        self.__aux_to_restore |= self.__aux_highlighted
+        self.__aux_highlighted.clear()
 
     @property
     def _first_print_preface(self):
@@ -222,58 +688,184 @@ class ANSIAccessPrinterList(AbstractAccessPrinterList):
     def _bg_color(self):
         return BACKGROUND_COLOR
 
-    def end_of_sort(self):
-        if self:
-            self.__getitem__(0)
-        self.__element_color = SORTED_BG_COLOR
-        for i in range(1, self._length):
-            self.__getitem__(i)
+    def _subcell_char(self, fill):
+        return (BACKGROUND_COLOR + SUBCELL_COLORS[self.__element_color] +
+                SUBCELL_CHARS[fill - 1])
+
+    @property
+    def _aux_cell_glyphs(self):
+        background = (BACKGROUND_COLOR, BACKGROUND_CHAR)
+        if self._cell_height == 1:
+            return [background, (AUX_ELEMENT_COLOR + FOREGROUND_COLOR,
+                                 ANSI_ELEMENT_CHAR)]
+        prefix = BACKGROUND_COLOR + SUBCELL_COLORS[AUX_ELEMENT_COLOR]
+        return [background] + [(prefix, char) for char in SUBCELL_CHARS]
+
+    def end_of_sort(self, sweep_step=1):
+        # The elements accessed by the sorting must be restored with the
+        # element color
+        self.flush_frames()
+        for start in range(0, self._length, sweep_step):
+            to_print = self.__get_to_print_restoring()
+            self.__element_color = SORTED_BG_COLOR
+            for item in range(start, min(start + sweep_step, self._length)):
+                to_print += self.__get_to_print_element(item,
+                                                        ACCESS_ELEMENT_COLOR)
+                self.__highlighted.add(item)
+            self._print_frame(to_print)
+        self.flush_frames()
+        # Repaint the elements left highlighted by the last frame
+        self._print_frame(self.__get_to_print_restoring())
+        self.finish()
+
+    @classmethod
+    def count_frames(cls, reads, writes, length, sweep_step=1):
+        # One frame per access, per sweep step and the restoring one
+        return reads + writes + -(-length // sweep_step) + 1
 
     def _setitem(self, key, value):
-        self.__print_item_setting(key)
+        self.__print_items_accessing((key,))
         return self._list.__setitem__(key, value)
 
     def _getitem(self, item):
-        self.__print_item_getting(item)
+        self.__print_items_accessing((item,))
         return self._list[item]
 
+    def _setslice(self, indices, values):
+        self.__print_items_accessing(indices)
+        for index, value in zip(indices, values):
+            self._list[index] = value
+
+    def _getslice(self, indices):
+        self.__print_items_accessing(indices)
+        return [self._list[index] for index in indices]
+
+    def _aux_setslice(self, indices, values):
+        for index, value in zip(indices, values):
+            self._aux[index] = value
+        self.__print_aux_accessing(indices)
+
+    def _aux_getslice(self, indices):
+        self.__print_aux_accessing(indices)
+        return [self._aux[index] for index in indices]
+
 
 class NoANSIAccessPrinterList(AbstractAccessPrinterList):
-    def __print_end_of_sort_till_item(self, item) -> None:
-        to_print = ''
-        for i in range(self._maximum):
-            for j in range(self._length):
-                if self._list[j] >= self._maximum - i:
-                    if j < item:
-                        char = SORTED_ELEMENT_CHAR
-                    elif j == item:
-                        char = ACCESS_ELEMENT_CHAR
-                    else:
-                        char = ELEMENT_CHAR
-                    to_print += char
-                else:
-                    to_print += BACKGROUND_CHAR
-            to_print += '\n'
-        to_print += '\n' * max(
-            shutil.get_terminal_size().lines - self._maximum, 0
+    # Cell codes of the framebuffer
+    __ELEMENT_CELL = 1
+    __ACCESS_CELL = 2
+    __SORTED_CELL = 3
+    # Codes of the partially filled top cells of the subcell mode follow
+    __SUBCELL_CELL = 4
+
+    def __init__(self, lst, delay, fps=None, sink=None, maximum=None,
+                 subcell=False):
+        # Items accessed since the last printed frame
+        self.__accessed = set()
+        # Slots of the auxiliary buffer accessed since the last printed frame
+        self.__aux_accessed = set()
+        # Count of the elements painted as sorted by end_of_sort
+        self.__sorted_count = 0
+        self.__framebuffer = None
+        # Framebuffer of the strip of the auxiliary buffer
+        self.__aux_framebuffer = None
+        self.__padding = b''
+        super().__init__(lst, delay, fps, sink, maximum, subcell)
+
+    def __create_framebuffer(self, width, height):
+        return ColumnFramebuffer(
+            width, height,
+            (BACKGROUND_CHAR, ELEMENT_CHAR, ACCESS_ELEMENT_CHAR,
+             SORTED_ELEMENT_CHAR) + tuple(SUBCELL_CHARS[:-1]),
+            sys.stdout.encoding or 'utf-8'
         )
-        self._print_frame(to_print)
 
-    def __print_item_accessing(self, item) -> None:
-        to_print = ''
-        for i in range(self._maximum):
-            for j in range(self._length):
-                if self._list[j] >= self._maximum - i:
-                    char = (ACCESS_ELEMENT_CHAR if item == j else
-                            ELEMENT_CHAR)
-                    to_print += char
-                else:
-                    to_print += BACKGROUND_CHAR
-            to_print += '\n'
-        to_print += '\n' * max(
-            shutil.get_terminal_size().lines - self._maximum, 0
+    def _fit_to_terminal(self, terminal_size):
+        super()._fit_to_terminal(terminal_size)
+        self.__framebuffer = self.__create_framebuffer(self._visible_length,
+                                                       self._rows)
+        heights = [self._height(self._list[i])
+                   for i in range(self._visible_length)]
+        sorted_count = min(self.__sorted_count, self._visible_length)
+        self.__framebuffer.set_columns(0, heights[:sorted_count],
+                                       self.__SORTED_CELL, self._cell_height,
+                                       self.__SUBCELL_CELL)
+        self.__framebuffer.set_columns(sorted_count, heights[sorted_count:],
+                                       self.__ELEMENT_CELL, self._cell_height,
+                                       self.__SUBCELL_CELL)
+        if self._aux_rows:
+            self.__aux_framebuffer = self.__create_framebuffer(
+                self._aux_visible_length, self._aux_rows
+            )
+            self.__aux_framebuffer.set_columns(
+                0, [self._aux_height(self._aux[i])
+                    for i in range(self._aux_visible_length)],
+                self.__ELEMENT_CELL, self._cell_height, self.__SUBCELL_CELL
+            )
+        self.__padding = b'\n' * max(
+            terminal_size.lines - self._aux_rows - self._rows, 0
         )
-        self._print_frame(to_print)
+
+    def __set_framebuffer_column(self, framebuffer, column, height, code):
+        if self._cell_height == 1:
+            framebuffer.set_column(column, height, code)
+            return
+        cells, fill = divmod(height, self._cell_height)
+        framebuffer.set_column(
+            column, cells, code,
+            self.__SUBCELL_CELL + fill - 1 if fill else BACKGROUND_CELL
+        )
+
+    def __set_column(self, item, code):
+        self.__set_framebuffer_column(self.__framebuffer, item,
+                                      self._height(self._list[item]), code)
+
+    def __set_aux_column(self, index, code):
+        self.__set_framebuffer_column(self.__aux_framebuffer, index,
+                                      self._aux_height(self._aux[index]),
+                                      code)
+
+    def __paint_columns(self, start, stop, code):
+        for item in range(start, min(stop, self._visible_length)):
+            self.__set_column(item, code)
+
+    def __get_to_print_frame(self):
+        if self._aux_rows:
+            return (self.__aux_framebuffer.render() +
+                    self.__framebuffer.render() + self.__padding)
+        return self.__framebuffer.render() + self.__padding
+
+    def __print_items_accessing(self, items) -> None:
+        for item in items:
+            if item < self._visible_length:
+                self.__accessed.add(item)
+                self.__set_column(item, self.__ACCESS_CELL)
+        self._print_frame(self.__get_to_print_frame)
+
+    def __print_aux_accessing(self, indices) -> None:
+        for index in indices:
+            if index < self._aux_visible_length:
+                self.__aux_accessed.add(index)
+                self.__set_aux_column(index, self.__ACCESS_CELL)
+        self._print_frame(self.__get_to_print_frame)
+
+    def _merge_frames(self, pending, frame):
+        # Every frame is a full redraw, so the latest one wins
+        return frame
+
+    def _on_frame_printed(self):
+        for item in self.__accessed:
+            if item < self._visible_length:
+                self.__set_column(item, self.__ELEMENT_CELL)
+        self.__accessed.clear()
+        for index in self.__aux_accessed:
+            if index < self._aux_visible_length:
+                self.__set_aux_column(index, self.__ELEMENT_CELL)
+        self.__aux_accessed.clear()
+
+    def _first_print(self):
+        self._sink.clear()
+        self._print_frame(self.__get_to_print_frame)
 
     @property
     def _first_print_preface(self):
@@ -287,23 +879,81 @@ class NoANSIAccessPrinterList(AbstractAccessPrinterList):
     def _bg_color(self):
         return ''
 
-    def end_of_sort(self):
-        for i in range(self._length):
-            self.__print_end_of_sort_till_item(i)
+    def end_of_sort(self, sweep_step=1):
+        self.flush_frames()
+        # Restore the elements accessed by the last frame of the sorting
+        self._on_frame_printed()
+        # Only the columns passed by the sweep are repainted, the rows are
+        # rebuilt from the framebuffer
+        for start in range(0, self._length, sweep_step):
+            self.__paint_columns(self.__sorted_count, start,
+                                 self.__SORTED_CELL)
+            self.__sorted_count = start
+            self.__paint_columns(start, start + sweep_step,
+                                 self.__ACCESS_CELL)
+            self._print_frame(self.__get_to_print_frame)
+        self.__paint_columns(self.__sorted_count, self._length,
+                             self.__SORTED_CELL)
+        self.__sorted_count = self._length
+        self._print_frame(self.__get_to_print_frame)
+        self.finish()
+
+    @classmethod
+    def count_frames(cls, reads, writes, length, sweep_step=1):
+        # Writes are printed before and after the element is changed, the
+        # sweep prints a frame per step and the final one
+        return reads + 2 * writes + -(-length // sweep_step) + 1
 
     def _setitem(self, key, value):
-        self.__print_item_accessing(key)
+        self.__print_items_accessing((key,))
         result = self._list.__setitem__(key, value)
-        self.__print_item_accessing(key)
+        self.__print_items_accessing((key,))
         return result
 
     def _getitem(self, item):
-        self.__print_item_accessing(item)
+        self.__print_items_accessing((item,))
         return self._list[item]
 
+    def _setslice(self, indices, values):
+        self.__print_items_accessing(indices)
+        for index, value in zip(indices, values):
+            self._list[index] = value
+        self.__print_items_accessing(indices)
 
-def choose_access_printer_list_class():
-    if terminal_utils.colorama:
+    def _getslice(self, indices):
+        self.__print_items_accessing(indices)
+        return [self._list[index] for index in indices]
+
+    def _aux_setslice(self, indices, values):
+        self.__print_aux_accessing(indices)
+        for index, value in zip(indices, values):
+            self._aux[index] = value
+        self.__print_aux_accessing(indices)
+
+    def _aux_getslice(self, indices):
+        self.__print_aux_accessing(indices)
+        return [self._aux[index] for index in indices]
+
+
+BACKEND_AUTO = 'auto'
+BACKEND_ANSI = 'ansi'
+BACKEND_PLAIN = 'plain'
+BACKEND_CURSES = 'curses'
+BACKENDS = (BACKEND_AUTO, BACKEND_ANSI, BACKEND_PLAIN, BACKEND_CURSES)
+
+
+def choose_access_printer_list_class(backend=BACKEND_AUTO):
+    """
+    Returns the access printer list class of the backend. The automatic
+    backend uses ANSI escape sequences if colorama is available
+    """
+    if backend == BACKEND_CURSES:
+        # Imported here since curses is not available on every platform
+        from curses_access_printer_list import CursesAccessPrinterList
+        return CursesAccessPrinterList
+    if backend == BACKEND_PLAIN:
+        return NoANSIAccessPrinterList
+    if backend == BACKEND_ANSI or terminal_utils.colorama:
         return ANSIAccessPrinterList
     else:
         return NoANSIAccessPrinterList
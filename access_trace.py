@@ -0,0 +1,100 @@
+import array
+import time
+import typing
+
+from access_printer_list import slice_assignment
+
+OP_READ = 0
+OP_WRITE = 1
+
+
+class AccessTrace:
+    """
+    Compact log of array accesses. Every access is stored as an
+    (op, index, value) record spread over three typed arrays, so a trace of
+    millions of accesses takes a few bytes per record
+    """
+
+    def __init__(self, initial: typing.Iterable[int]):
+        self.initial = list(initial)
+        self.ops = array.array('B')
+        self.indices = array.array('Q')
+        self.values = array.array('q')
+
+    def append(self, op: int, index: int, value: int):
+        self.ops.append(op)
+        self.indices.append(index)
+        self.values.append(value)
+
+    @property
+    def reads(self) -> int:
+        return self.ops.count(OP_READ)
+
+    @property
+    def writes(self) -> int:
+        return self.ops.count(OP_WRITE)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return zip(self.ops, self.indices, self.values)
+
+
+class TraceRecorderList:
+    """
+    Thin list proxy that logs every access to an AccessTrace instead of
+    visualizing it
+    """
+
+    def __init__(self, lst, trace: AccessTrace = None):
+        self._list = lst
+        self.trace = trace if trace is not None else AccessTrace(lst)
+        self.__append = self.trace.append
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[index]
+                    for index in range(*item.indices(len(self._list)))]
+        value = self._list[item]
+        self.__append(OP_READ, item % len(self._list), value)
+        return value
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            for index, item in zip(*slice_assignment(key, len(self._list),
+                                                     value)):
+                self[index] = item
+            return
+        self.__append(OP_WRITE, key % len(self._list), value)
+        self._list[key] = value
+
+    def __len__(self):
+        return len(self._list)
+
+
+def record_trace(
+        sorting_function, lst
+) -> typing.Tuple[AccessTrace, float]:
+    """
+    Sorts the list in-place while recording its access trace
+    :param sorting_function: Function which sorts the list
+    :param lst: List to sort
+    :return: Recorded trace and the time spent in the sorting function
+    """
+    recorder = TraceRecorderList(lst)
+    start_time = time.perf_counter()
+    sorting_function(recorder)
+    return recorder.trace, time.perf_counter() - start_time
+
+
+def render_trace(trace: AccessTrace, access_printer_list):
+    """
+    Plays the trace through the access printer list. The list must be
+    created over a copy of trace.initial
+    """
+    for op, index, value in trace:
+        if op == OP_READ:
+            access_printer_list[index]
+        else:
+            access_printer_list[index] = value
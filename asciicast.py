@@ -0,0 +1,87 @@
+import json
+import os
+import time
+import typing
+
+CLEAR_SCREEN = '\033[2J\033[H'
+FILE_BUFFER_SIZE = 1 << 20
+
+
+class AsciicastSink:
+    """
+    Output sink which records frames into an asciinema v2 .cast file instead
+    of the terminal. Nothing sleeps: the delays only advance the clock of the
+    recording, so the export runs as fast as frames are built
+    """
+    is_terminal = False
+
+    def __init__(self, path: str, columns: int, lines: int,
+                 title: typing.Optional[str] = None,
+                 metadata: typing.Optional[dict] = None):
+        """
+        :param metadata: Description of the recording, e.g. how its array
+        was generated, stored in the header as it is
+        """
+        self.__file = open(path, 'w', encoding='utf-8',
+                           buffering=FILE_BUFFER_SIZE)
+        self.__size = os.terminal_size((columns, lines))
+        self.__clock = 0.0
+        self.__pending = []
+        self.bytes_written = 0
+        self.frames = 0
+        header = {
+            'version': 2,
+            'width': columns,
+            'height': lines,
+            'timestamp': int(time.time()),
+            'env': {'TERM': os.environ.get('TERM', 'xterm-256color')},
+        }
+        if title:
+            header['title'] = title
+        if metadata:
+            header['metadata'] = metadata
+        self.__write_line(json.dumps(header) + '\n')
+
+    def __write_line(self, line: str):
+        self.__file.write(line)
+        # The file is UTF-8, so the characters aren't the bytes
+        self.bytes_written += len(line.encode('utf-8'))
+
+    def terminal_size(self) -> os.terminal_size:
+        return self.__size
+
+    def write(self, data: typing.Union[str, bytes]):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        self.__pending.append(data)
+
+    def end_frame(self):
+        """
+        Records the frame as one output event at the current clock
+        """
+        if not self.__pending:
+            return
+        line = json.dumps([round(self.__clock, 6), 'o',
+                           ''.join(self.__pending)]) + '\n'
+        self.__pending.clear()
+        self.__write_line(line)
+        self.frames += 1
+
+    def flush(self):
+        self.end_frame()
+
+    def clear(self):
+        self.write(CLEAR_SCREEN)
+
+    def time(self) -> float:
+        """
+        Clock of the recording, advanced only by sleep
+        """
+        return self.__clock
+
+    def sleep(self, seconds: float):
+        self.__clock += seconds
+
+    def close(self):
+        self.end_frame()
+        self.__file.close()
@@ -0,0 +1,302 @@
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import signal
+import sys
+import typing
+
+from benchmark import run_benchmark
+from input_shapes import (INPUT_SHAPES, PARAMETRIC_SHAPES,
+                          SHAPE_PARAMETER_SEPARATOR, generate_array,
+                          parse_shape)
+from sorting_algorithms import (SORTING_ALGORITHMS, load_sorting_function,
+                                load_sorting_functions)
+
+DEFAULT_LENGTHS = '100,1000,10000'
+DEFAULT_SEEDS = '0'
+DEFAULT_MAXIMUM = 1000
+DEFAULT_TIMEOUT = 60
+
+# The job timeout needs the real-time interval timer, which isn't available
+# on Windows
+JOB_TIMEOUT_AVAILABLE = hasattr(signal, 'setitimer')
+
+# The text will be formatted by argparse
+DESCRIPTION = '''
+Benchmarks every combination of sorting algorithms, array lengths, input
+shapes and seeds on all CPU cores and streams one result row per job as soon
+as it finishes
+'''
+ALGORITHMS_HELP = '''
+Comma-separated sorting algorithms. By default all the builtin algorithms
+are used: {sorting_algorithms_names}
+'''
+SCRIPT_HELP = '''
+Path to the external script where the algorithms which are not builtin will
+be imported from
+'''
+LENGTHS_HELP = f'Comma-separated array lengths. By default {DEFAULT_LENGTHS}'
+SHAPES_HELP = '''
+Comma-separated input shapes. By default all the shapes are used: {shapes}.
+The {parametric} shapes may take an integer parameter after "{separator}",
+e.g. sawtooth{separator}8
+'''
+SEEDS_HELP = f'Comma-separated random seeds. By default {DEFAULT_SEEDS}'
+MIN_HELP = 'Minimum value of the generating arrays'
+MAX_HELP = f'''
+Maximum value of the generating arrays. By default {DEFAULT_MAXIMUM}
+'''
+TIMEOUT_HELP = f'''
+Time limit of one job in seconds; jobs running longer are reported with the
+"timeout" status. By default {DEFAULT_TIMEOUT}. Not supported on Windows,
+where the jobs aren't time limited
+'''
+WORKERS_HELP = 'Count of worker processes. By default the count of CPU cores'
+FORMAT_HELP = 'Output format: csv or json (one JSON object per line)'
+OUTPUT_HELP = 'Output file. By default results are printed'
+
+RESULT_FIELDS = (
+    'algorithm', 'length', 'shape', 'seed', 'min', 'max', 'status',
+    'wall_time', 'reads', 'writes', 'comparisons', 'sorted', 'error'
+)
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _raise_job_timeout(signum, frame):
+    raise JobTimeout
+
+
+def run_job(job: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    """
+    Runs one benchmark job in a worker process. The job is interrupted with
+    SIGALRM when it exceeds its timeout
+    """
+    result = {field: job.get(field) for field in RESULT_FIELDS}
+    timer = JOB_TIMEOUT_AVAILABLE and job['timeout']
+    if timer:
+        signal.signal(signal.SIGALRM, _raise_job_timeout)
+        signal.setitimer(signal.ITIMER_REAL, job['timeout'])
+    try:
+        sorting_function = load_sorting_function(job['algorithm'],
+                                                 job['script'])
+        array = generate_array(job['shape'], job['min'], job['max'],
+                               job['length'], job['seed'])
+        result.update(run_benchmark(sorting_function, array))
+        result['status'] = 'ok'
+    except JobTimeout:
+        result['status'] = 'timeout'
+    except Exception as exception:
+        result['status'] = 'error'
+        result['error'] = f'{type(exception).__name__}: {exception}'
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result
+
+
+def iterate_jobs(algorithms, lengths, shapes, seeds, min_val, max_val,
+                 timeout, script=None):
+    for algorithm in algorithms:
+        for length in lengths:
+            for shape in shapes:
+                for seed in seeds:
+                    yield {
+                        'algorithm': algorithm,
+                        'length': length,
+                        'shape': shape,
+                        'seed': seed,
+                        'min': min_val,
+                        'max': max_val,
+                        'timeout': timeout,
+                        'script': script,
+                    }
+
+
+class _CSVResultWriter:
+    def __init__(self, stream):
+        self.__stream = stream
+        self.__writer = csv.DictWriter(stream, RESULT_FIELDS)
+        self.__writer.writeheader()
+
+    def write(self, result):
+        self.__writer.writerow(result)
+        self.__stream.flush()
+
+
+class _JSONResultWriter:
+    def __init__(self, stream):
+        self.__stream = stream
+
+    def write(self, result):
+        self.__stream.write(json.dumps(result) + '\n')
+        self.__stream.flush()
+
+
+RESULT_WRITERS = {
+    'csv': _CSVResultWriter,
+    'json': _JSONResultWriter,
+}
+
+
+def run_matrix(jobs, writer, workers=None):
+    """
+    Runs the jobs on a process pool and writes every result as soon as its
+    job finishes
+    :return: Count of the jobs which didn't finish with the "ok" status
+    """
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result['status'] != 'ok':
+                failed += 1
+            writer.write(result)
+    return failed
+
+
+def _split(value: str, item_type=str) -> list:
+    return [item_type(item) for item in value.split(',') if item]
+
+
+def _create_parser():
+    parser = argparse.ArgumentParser(prog='matrix', description=DESCRIPTION)
+    parser.add_argument(
+        '-a', '--algorithms',
+        default=','.join(SORTING_ALGORITHMS),
+        help=ALGORITHMS_HELP.format(
+            sorting_algorithms_names=', '.join(SORTING_ALGORITHMS)
+        ),
+        dest='algorithms'
+    )
+    parser.add_argument('-s', '--script', help=SCRIPT_HELP, dest='script')
+    parser.add_argument(
+        '-N', '--lengths',
+        default=DEFAULT_LENGTHS,
+        help=LENGTHS_HELP,
+        dest='lengths'
+    )
+    parser.add_argument(
+        '--shapes',
+        default=','.join(INPUT_SHAPES),
+        help=SHAPES_HELP.format(shapes=', '.join(INPUT_SHAPES),
+                                parametric=', '.join(PARAMETRIC_SHAPES),
+                                separator=SHAPE_PARAMETER_SEPARATOR),
+        dest='shapes'
+    )
+    parser.add_argument(
+        '--seeds',
+        default=DEFAULT_SEEDS,
+        help=SEEDS_HELP,
+        dest='seeds'
+    )
+    parser.add_argument(
+        '--min', '-n',
+        default=1,
+        help=MIN_HELP,
+        type=int,
+        dest='min'
+    )
+    parser.add_argument(
+        '--max', '-x',
+        default=DEFAULT_MAXIMUM,
+        help=MAX_HELP,
+        type=int,
+        dest='max'
+    )
+    parser.add_argument(
+        '--timeout', '-t',
+        help=TIMEOUT_HELP,
+        type=float,
+        dest='timeout'
+    )
+    parser.add_argument(
+        '--workers', '-j',
+        help=WORKERS_HELP,
+        type=int,
+        dest='workers'
+    )
+    parser.add_argument(
+        '--format',
+        default='csv',
+        choices=list(RESULT_WRITERS),
+        help=FORMAT_HELP,
+        dest='format'
+    )
+    parser.add_argument('-o', '--output', help=OUTPUT_HELP, dest='output')
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of the matrix subcommand
+    """
+    args = _create_parser().parse_args(argv)
+    try:
+        lengths = _split(args.lengths, int)
+        seeds = _split(args.seeds, int)
+    except ValueError:
+        print('Error. --lengths and --seeds must be comma-separated integers')
+        return
+    shapes = _split(args.shapes)
+    for shape in shapes:
+        try:
+            parse_shape(shape)
+        except ValueError as exception:
+            print(f'Error. {exception}')
+            return
+    if not all(length > 0 for length in lengths):
+        print('Error. Array lengths must be greater than 0')
+        return
+    if not 0 < args.min <= args.max:
+        print('Error. --max value must be greater than or equal to --min '
+              'value, which must be greater than 0')
+        return
+    if args.workers is not None and not args.workers > 0:
+        print('Error. --workers must be greater than 0')
+        return
+    timeout = args.timeout
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT if JOB_TIMEOUT_AVAILABLE else None
+    elif not JOB_TIMEOUT_AVAILABLE:
+        print('Error. --timeout is not supported on your platform')
+        return
+    elif not timeout > 0:
+        print('Error. --timeout must be greater than 0')
+        return
+
+    # The algorithms are checked once instead of failing every job
+    algorithms = _split(args.algorithms)
+    try:
+        load_sorting_functions(algorithms, args.script)
+    except ValueError as exception:
+        print(f'Error. {exception}')
+        return
+    except FileNotFoundError:
+        print(f'Error. File {args.script} not found')
+        return
+    except Exception as exception:
+        print(f'Error. {type(exception).__name__} exception occurred during '
+              f'{args.script} executing. Additional info: {exception}')
+        return
+
+    jobs = iterate_jobs(algorithms, lengths, shapes, seeds, args.min,
+                        args.max, timeout, args.script)
+    stream = (open(args.output, 'w', newline='') if args.output else
+              sys.stdout)
+    try:
+        failed = run_matrix(jobs, RESULT_WRITERS[args.format](stream),
+                            args.workers or os.cpu_count())
+    except KeyboardInterrupt:
+        print('Error. Program execution was interrupted', file=sys.stderr)
+        return
+    finally:
+        if args.output:
+            stream.close()
+    if failed:
+        print(f'{failed} jobs did not finish successfully', file=sys.stderr)
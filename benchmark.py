@@ -0,0 +1,113 @@
+import time
+import typing
+
+
+class CountedElement(int):
+    """
+    Integer which counts its comparisons in the class-level counter
+    """
+    __slots__ = ()
+    comparisons = 0
+
+    def __lt__(self, other):
+        CountedElement.comparisons += 1
+        return int.__lt__(self, other)
+
+    def __le__(self, other):
+        CountedElement.comparisons += 1
+        return int.__le__(self, other)
+
+    def __gt__(self, other):
+        CountedElement.comparisons += 1
+        return int.__gt__(self, other)
+
+    def __ge__(self, other):
+        CountedElement.comparisons += 1
+        return int.__ge__(self, other)
+
+    def __eq__(self, other):
+        CountedElement.comparisons += 1
+        return int.__eq__(self, other)
+
+    def __ne__(self, other):
+        CountedElement.comparisons += 1
+        return int.__ne__(self, other)
+
+    __hash__ = int.__hash__
+
+
+class CountingList(list):
+    """
+    List which counts reads and writes of its items
+    """
+
+    def __init__(self, iterable=(), counter: 'CountingList' = None):
+        """
+        :param counter: List whose counters count the accesses, this list
+        by default
+        """
+        super().__init__(iterable)
+        self.reads = 0
+        self.writes = 0
+        self.__counter = counter if counter is not None else self
+
+    def make_aux_buffer(self, length: int) -> 'CountingList':
+        """
+        Returns the auxiliary buffer whose accesses are counted with the
+        accesses of this list, as they are visualized with them
+        """
+        return CountingList([None] * length, self.__counter)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            result = super().__getitem__(item)
+            self.__counter.reads += len(result)
+            return result
+        self.__counter.reads += 1
+        return super().__getitem__(item)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = list(value)
+            self.__counter.writes += len(value)
+        else:
+            self.__counter.writes += 1
+        super().__setitem__(key, value)
+
+
+def count_accesses(
+        sorting_function, array: typing.List[int]
+) -> typing.Dict[str, int]:
+    """
+    Sorts a copy of the array counting reads, writes and comparisons
+    :return: Dictionary with the reads, writes and comparisons counts
+    """
+    counting_list = CountingList(map(CountedElement, array))
+    CountedElement.comparisons = 0
+    sorting_function(counting_list)
+    return {
+        'reads': counting_list.reads,
+        'writes': counting_list.writes,
+        'comparisons': CountedElement.comparisons,
+    }
+
+
+def run_benchmark(
+        sorting_function, array: typing.List[int]
+) -> typing.Dict[str, typing.Any]:
+    """
+    Times the sorting function on a plain copy of the array and counts its
+    accesses on another copy. Nothing is printed
+    :return: Dictionary with the wall time in seconds, the access counts and
+    whether the array got sorted
+    """
+    to_sort = list(array)
+    start_time = time.perf_counter()
+    sorting_function(to_sort)
+    wall_time = time.perf_counter() - start_time
+    result = {
+        'wall_time': wall_time,
+        'sorted': to_sort == sorted(array),
+    }
+    result.update(count_accesses(sorting_function, array))
+    return result
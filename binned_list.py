@@ -0,0 +1,217 @@
+import array
+import typing
+
+from access_printer_list import SUBCELL_STEPS, slice_assignment
+
+AGGREGATE_MAX = 'max'
+AGGREGATE_MEAN = 'mean'
+AGGREGATES = (AGGREGATE_MAX, AGGREGATE_MEAN)
+
+
+def _typecode_for(maximum: int) -> str:
+    """
+    Returns the smallest signed array typecode which holds the maximum
+    """
+    for typecode in ('b', 'h', 'i', 'l', 'q'):
+        if maximum < 1 << (8 * array.array(typecode).itemsize - 1):
+            return typecode
+    raise OverflowError(f'{maximum} does not fit into an array')
+
+
+def bin_size(terminal_size, full_screen=False,
+             subcell=False) -> typing.Tuple[int, int]:
+    """
+    Returns the count of the columns and the rows of the binned
+    visualization in the terminal of the size
+    :param full_screen: If set, the whole terminal is used instead of its
+    half
+    :param subcell: If set, the rows are counted in the eighths of the cells
+    """
+    columns, lines = terminal_size
+    if full_screen:
+        columns, rows = columns - 1, lines - 1
+    else:
+        columns, rows = columns // 2, lines // 2
+    if subcell:
+        # The buckets are quantised to the eighths of the rows
+        rows *= SUBCELL_STEPS
+    return columns, rows
+
+
+class MaxSegmentTree:
+    """
+    Iterative segment tree of maximums over an array buffer
+    """
+
+    def __init__(self, values: typing.Sequence[int], typecode='q'):
+        size = len(values)
+        self.__size = size
+        tree = array.array(typecode, bytes(array.array(typecode).itemsize *
+                                           size))
+        tree.extend(values)
+        for i in range(size - 1, 0, -1):
+            left = tree[2 * i]
+            right = tree[2 * i + 1]
+            tree[i] = left if left > right else right
+        self.__tree = tree
+
+    def update(self, index: int, value: int):
+        tree = self.__tree
+        index += self.__size
+        tree[index] = value
+        index //= 2
+        while index:
+            left = tree[2 * index]
+            right = tree[2 * index + 1]
+            maximum = left if left > right else right
+            if tree[index] == maximum:
+                # The maximums of the ancestors can't change either
+                break
+            tree[index] = maximum
+            index //= 2
+
+    def query(self, start: int, stop: int) -> int:
+        """
+        Returns the maximum of the values in [start, stop)
+        """
+        tree = self.__tree
+        result = tree[start + self.__size]
+        start += self.__size
+        stop += self.__size
+        while start < stop:
+            if start & 1:
+                if tree[start] > result:
+                    result = tree[start]
+                start += 1
+            if stop & 1:
+                stop -= 1
+                if tree[stop] > result:
+                    result = tree[stop]
+            start //= 2
+            stop //= 2
+        return result
+
+
+class BinnedList:
+    """
+    List proxy which visualizes an array larger than the terminal: elements
+    are binned into columns and every column shows an aggregate (maximum or
+    mean) of its bucket quantised to the terminal rows. A write repaints its
+    column only if the drawn height of the column changes
+    """
+
+    def __init__(self, lst, columns: int, rows: int, aggregate: str,
+                 access_printer_list_factory):
+        """
+        :param columns: Maximal count of the drawn columns
+        :param rows: Height of the highest column
+        :param aggregate: One of AGGREGATES
+        :param access_printer_list_factory: Callable which creates the access
+        printer list from the list of column heights and the maximal height
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f'Unknown aggregate {aggregate}')
+        self._list = lst
+        self.__length = len(lst)
+        self.__bucket_size = -(-self.__length // columns)
+        self.__columns = -(-self.__length // self.__bucket_size)
+        self.__rows = rows
+        self.__maximum = max(lst)
+        self.__aggregate = aggregate
+
+        bucket_size = self.__bucket_size
+        if aggregate == AGGREGATE_MAX:
+            self.__tree = MaxSegmentTree(lst, _typecode_for(self.__maximum))
+            aggregates = [
+                self.__tree.query(start, min(start + bucket_size,
+                                             self.__length))
+                for start in range(0, self.__length, bucket_size)
+            ]
+        else:
+            self.__sums = array.array('q', (
+                sum(lst[start:start + bucket_size])
+                for start in range(0, self.__length, bucket_size)
+            ))
+            self.__counts = array.array('q', (
+                min(bucket_size, self.__length - start)
+                for start in range(0, self.__length, bucket_size)
+            ))
+            aggregates = [
+                bucket_sum // count
+                for bucket_sum, count in zip(self.__sums, self.__counts)
+            ]
+        self.__heights = [self.__quantise(value) for value in aggregates]
+        self.__printer = access_printer_list_factory(self.__heights, rows)
+
+    def __quantise(self, value) -> int:
+        return -(-value * self.__rows // self.__maximum)
+
+    def __update_aggregate(self, key, old_value, value):
+        if self.__aggregate == AGGREGATE_MAX:
+            self.__tree.update(key, value)
+        else:
+            self.__sums[key // self.__bucket_size] += value - old_value
+
+    def __column_height(self, column) -> int:
+        if self.__aggregate == AGGREGATE_MAX:
+            start = column * self.__bucket_size
+            aggregate = self.__tree.query(
+                start, min(start + self.__bucket_size, self.__length)
+            )
+        else:
+            aggregate = self.__sums[column] // self.__counts[column]
+        return self.__quantise(aggregate)
+
+    def __update_column(self, key, old_value, value):
+        self.__update_aggregate(key, old_value, value)
+        column = key // self.__bucket_size
+        height = self.__column_height(column)
+        if height != self.__heights[column]:
+            self.__printer[column] = height
+
+    def __set_slice(self, key, value):
+        """
+        Writes the slice and repaints the range of the changed columns in
+        one frame
+        """
+        columns = set()
+        for index, item in zip(*slice_assignment(key, self.__length, value)):
+            old_value = self._list[index]
+            self._list[index] = item
+            if item != old_value:
+                self.__update_aggregate(index, old_value, item)
+                columns.add(index // self.__bucket_size)
+        if not columns:
+            return
+        start = min(columns)
+        stop = max(columns) + 1
+        heights = [self.__column_height(column)
+                   for column in range(start, stop)]
+        if heights != self.__heights[start:stop]:
+            self.__printer[start:stop] = heights
+
+    def end_of_sort(self, sweep_step=1):
+        self.__printer.end_of_sort(sweep_step)
+
+    def finish(self):
+        self.__printer.finish()
+
+    def add_frame_hook(self, hook):
+        self.__printer.add_frame_hook(hook)
+
+    def __getitem__(self, item):
+        return self._list[item]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self.__set_slice(key, value)
+            return
+        if key < 0:
+            key += self.__length
+        old_value = self._list[key]
+        self._list[key] = value
+        if value != old_value:
+            self.__update_column(key, old_value, value)
+
+    def __len__(self):
+        return self.__length
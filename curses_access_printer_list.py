@@ -0,0 +1,268 @@
+import atexit
+import curses
+import os
+import shutil
+
+import terminal_utils
+from access_printer_list import (ANSI_ELEMENT_CHAR, SUBCELL_CHARS,
+                                 AbstractAccessPrinterList)
+
+_ELEMENT_PAIR = 1
+_ACCESS_PAIR = 2
+_SORTED_PAIR = 3
+_BACKGROUND_PAIR = 4
+# Partially filled top cells of the subcell mode
+_ELEMENT_TOP_PAIR = 5
+_ACCESS_TOP_PAIR = 6
+_SORTED_TOP_PAIR = 7
+# Columns of the auxiliary buffer
+_AUX_PAIR = 8
+_AUX_TOP_PAIR = 9
+
+
+def _end_curses():
+    if not curses.isendwin():
+        curses.endwin()
+
+
+class CursesAccessPrinterList(AbstractAccessPrinterList):
+    """
+    Access printer list which draws the columns into a curses window and
+    lets curses compute the minimal terminal updates. Colors don't need
+    colorama; terminals without colors get reversed and checkerboard cells.
+    Resizes are caught as KEY_RESIZE
+    """
+
+    def __init__(self, lst, delay, fps=None, sink=None, maximum=None,
+                 subcell=False):
+        self.__window = curses.initscr()
+        # The terminal must be restored even if the visualization is
+        # interrupted
+        atexit.register(_end_curses)
+        curses.noecho()
+        curses.cbreak()
+        self.__window.keypad(True)
+        self.__window.nodelay(True)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        self.__init_cells()
+        # Items accessed since the last printed frame
+        self.__accessed = set()
+        # Slots of the auxiliary buffer accessed since the last printed frame
+        self.__aux_accessed = set()
+        # Count of the elements painted as sorted by end_of_sort
+        self.__sorted_count = 0
+        # When SIGWINCH is caught by the watcher, curses never sees it and
+        # has to be told about the new size. Otherwise the keys are polled
+        # for KEY_RESIZE on every frame
+        self.__resize_watcher = terminal_utils.ResizeWatcher()
+        if not self.__resize_watcher.install():
+            self.__resize_watcher = None
+        super().__init__(lst, delay, fps, sink, maximum, subcell)
+
+    def __init_cells(self):
+        """
+        Chooses the characters and attributes of the cells
+        """
+        if curses.has_colors():
+            curses.start_color()
+            pairs = ((_ELEMENT_PAIR, curses.COLOR_WHITE),
+                     (_ACCESS_PAIR, curses.COLOR_RED),
+                     (_SORTED_PAIR, curses.COLOR_GREEN),
+                     (_BACKGROUND_PAIR, curses.COLOR_BLUE),
+                     (_AUX_PAIR, curses.COLOR_CYAN))
+            for pair, color in pairs:
+                curses.init_pair(pair, curses.COLOR_BLACK, color)
+            top_pairs = ((_ELEMENT_TOP_PAIR, curses.COLOR_WHITE),
+                         (_ACCESS_TOP_PAIR, curses.COLOR_RED),
+                         (_SORTED_TOP_PAIR, curses.COLOR_GREEN),
+                         (_AUX_TOP_PAIR, curses.COLOR_CYAN))
+            for pair, color in top_pairs:
+                curses.init_pair(pair, color, curses.COLOR_BLUE)
+            element_char = ord(ANSI_ELEMENT_CHAR)
+            self.__element_cell = element_char | curses.color_pair(
+                _ELEMENT_PAIR)
+            self.__access_cell = element_char | curses.color_pair(
+                _ACCESS_PAIR)
+            self.__sorted_cell = element_char | curses.color_pair(
+                _SORTED_PAIR)
+            self.__aux_cell = element_char | curses.color_pair(_AUX_PAIR)
+            self.__background_cell = ord(' ') | curses.color_pair(
+                _BACKGROUND_PAIR)
+            # Attributes of the top cells of the columns
+            self.__top_attributes = {
+                self.__element_cell: curses.color_pair(_ELEMENT_TOP_PAIR),
+                self.__access_cell: curses.color_pair(_ACCESS_TOP_PAIR),
+                self.__sorted_cell: curses.color_pair(_SORTED_TOP_PAIR),
+                self.__aux_cell: curses.color_pair(_AUX_TOP_PAIR),
+            }
+        else:
+            self.__element_cell = ord(' ') | curses.A_REVERSE
+            self.__access_cell = curses.ACS_CKBOARD
+            self.__sorted_cell = curses.ACS_BLOCK | curses.A_BOLD
+            self.__aux_cell = self.__element_cell
+            self.__background_cell = ord(' ')
+            self.__top_attributes = {
+                self.__element_cell: curses.A_NORMAL,
+                self.__access_cell: curses.A_DIM,
+                self.__sorted_cell: curses.A_BOLD,
+            }
+
+    def __paint_bar(self, first_row, rows, column, height, cell):
+        """
+        Paints the column as a bar of the height growing from the bottom of
+        the rows which start from the first_row
+        """
+        cells, fill = divmod(height, self._cell_height)
+        top = rows - cells
+        if fill:
+            # The eighth blocks aren't chtypes, so the top cell is a string
+            top -= 1
+            self.__window.addstr(first_row + top, column,
+                                 SUBCELL_CHARS[fill - 1],
+                                 self.__top_attributes[cell])
+        if top:
+            self.__window.vline(first_row, column, self.__background_cell,
+                                top)
+        if cells:
+            self.__window.vline(first_row + rows - cells, column, cell,
+                                cells)
+
+    def __paint_column(self, item, cell):
+        if not 0 <= item < self._visible_length:
+            return
+        # The strip of the auxiliary buffer is above the columns
+        self.__paint_bar(self._aux_rows, self._rows, item,
+                         self._height(self._list[item]), cell)
+
+    def __paint_aux_column(self, index, cell):
+        if not 0 <= index < self._aux_visible_length:
+            return
+        self.__paint_bar(0, self._aux_rows, index,
+                         self._aux_height(self._aux[index]), cell)
+
+    def __paint_columns(self, start, stop, cell):
+        for item in range(start, min(stop, self._visible_length)):
+            self.__paint_column(item, cell)
+
+    def __refresh(self) -> bytes:
+        """
+        Lets curses write the changes of the window; nothing is written to
+        the sink
+        """
+        self.__window.noutrefresh()
+        curses.doupdate()
+        return b''
+
+    def __print_items_accessing(self, items):
+        for item in items:
+            self.__accessed.add(item)
+            self.__paint_column(item, self.__access_cell)
+        self._print_frame(self.__refresh)
+
+    def __print_aux_accessing(self, indices):
+        for index in indices:
+            self.__aux_accessed.add(index)
+            self.__paint_aux_column(index, self.__access_cell)
+        self._print_frame(self.__refresh)
+
+    def _merge_frames(self, pending, frame):
+        # The window keeps the whole picture, so refreshing once is enough
+        return frame
+
+    def _on_frame_printed(self):
+        for item in self.__accessed:
+            self.__paint_column(item, self.__element_cell)
+        self.__accessed.clear()
+        for index in self.__aux_accessed:
+            self.__paint_aux_column(index, self.__aux_cell)
+        self.__aux_accessed.clear()
+
+    def _catch_terminal_resizing(self) -> bool:
+        if self.__resize_watcher is not None:
+            if not self.__resize_watcher.pop_resized():
+                return False
+            columns, lines = shutil.get_terminal_size()
+            # Queues KEY_RESIZE
+            curses.resizeterm(lines, columns)
+        if self.__window.getch() != curses.KEY_RESIZE:
+            return False
+        lines, columns = self.__window.getmaxyx()
+        self._resize(os.terminal_size((columns, lines)))
+        return True
+
+    def _first_print(self):
+        self.__window.bkgd(self.__background_cell)
+        self.__window.erase()
+        self.__accessed.clear()
+        self.__aux_accessed.clear()
+        for index in range(self._aux_visible_length):
+            self.__paint_aux_column(index, self.__aux_cell)
+        self.__paint_columns(0, self.__sorted_count, self.__sorted_cell)
+        self.__paint_columns(self.__sorted_count, self._visible_length,
+                             self.__element_cell)
+        self._print_frame(self.__refresh)
+
+    @property
+    def _first_print_preface(self):
+        return ''
+
+    @property
+    def _element_char(self):
+        return ANSI_ELEMENT_CHAR
+
+    @property
+    def _bg_color(self):
+        return ''
+
+    def end_of_sort(self, sweep_step=1):
+        self.flush_frames()
+        # Restore the elements accessed by the last frame of the sorting
+        self._on_frame_printed()
+        for start in range(0, self._length, sweep_step):
+            self.__paint_columns(self.__sorted_count, start,
+                                 self.__sorted_cell)
+            self.__sorted_count = start
+            self.__paint_columns(start, start + sweep_step,
+                                 self.__access_cell)
+            self._print_frame(self.__refresh)
+        self.__paint_columns(self.__sorted_count, self._length,
+                             self.__sorted_cell)
+        self.__sorted_count = self._length
+        self._print_frame(self.__refresh)
+        self.finish()
+        _end_curses()
+
+    @classmethod
+    def count_frames(cls, reads, writes, length, sweep_step=1):
+        # One frame per access, per sweep step and the final one
+        return reads + writes + -(-length // sweep_step) + 1
+
+    def _setitem(self, key, value):
+        result = self._list.__setitem__(key, value)
+        self.__print_items_accessing((key,))
+        return result
+
+    def _getitem(self, item):
+        self.__print_items_accessing((item,))
+        return self._list[item]
+
+    def _setslice(self, indices, values):
+        for index, value in zip(indices, values):
+            self._list[index] = value
+        self.__print_items_accessing(indices)
+
+    def _getslice(self, indices):
+        self.__print_items_accessing(indices)
+        return [self._list[index] for index in indices]
+
+    def _aux_setslice(self, indices, values):
+        for index, value in zip(indices, values):
+            self._aux[index] = value
+        self.__print_aux_accessing(indices)
+
+    def _aux_getslice(self, indices):
+        self.__print_aux_accessing(indices)
+        return [self._aux[index] for index in indices]
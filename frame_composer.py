@@ -0,0 +1,146 @@
+import array
+import functools
+import sys
+import typing
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpy = None
+
+
+@functools.lru_cache(maxsize=None)
+def _level_tables(rows: int, cell_height: int) -> typing.List[bytes]:
+    """
+    Returns the translation tables of the rows, from the top, which map a
+    column height to the fill of the cell of the row
+    """
+    tables = []
+    for row in range(rows):
+        level = (rows - row - 1) * cell_height
+        table = (bytes(level + 1) + bytes(range(1, cell_height)) +
+                 bytes((cell_height,)) * max(256 - level - cell_height, 0))
+        tables.append(table[:256])
+    return tables
+
+
+@functools.lru_cache(maxsize=None)
+def _column_fills(height: int, rows: int, cell_height: int) -> bytes:
+    """
+    Returns the fills of the cells of the column, from the top
+    """
+    return bytes(
+        min(max(height - (rows - row - 1) * cell_height, 0), cell_height)
+        for row in range(rows)
+    )
+
+
+def fill_rows(heights: typing.Sequence[int], rows: int,
+              cell_height=1) -> typing.List[bytes]:
+    """
+    Returns the rows, from the top, of the fills of the columns: the count
+    of the filled units of every cell, from 0 to cell_height. The heights
+    are in the units
+    """
+    if not heights:
+        return [b''] * rows
+    if max(heights) < 256:
+        # Every row is the heights translated with the table of its level.
+        # It's faster than numpy, whose array conversion costs more than it
+        # saves at the terminal sizes
+        heights = bytes(heights)
+        return [heights.translate(table)
+                for table in _level_tables(rows, cell_height)]
+    if numpy is not None:
+        levels = numpy.arange(rows - 1, -1, -1)[:, None] * cell_height
+        fills = numpy.clip(numpy.asarray(heights)[None, :] - levels, 0,
+                           cell_height).astype(numpy.uint8)
+        return [row.tobytes() for row in fills]
+    columns = [_column_fills(height, rows, cell_height) for height in heights]
+    return [bytes(row) for row in zip(*columns)]
+
+
+# Keys of the runs of the cells are 16-bit
+_RUN_KEYS = 1 << 16
+
+
+def _run_length(codes_count: int) -> int:
+    """
+    Returns the count of the cells composed by one lookup: the most for
+    which the keys of the run and the code of the cell before it fit into
+    _RUN_KEYS
+    """
+    run_length = 1
+    while codes_count ** (run_length + 2) <= _RUN_KEYS:
+        run_length += 1
+    return run_length
+
+
+@functools.lru_cache(maxsize=None)
+def _run_table(glyphs: typing.Tuple[typing.Tuple[str, str], ...],
+               run_length: int) -> typing.List[str]:
+    """
+    Returns the texts of the runs of run_length cells indexed by the key:
+    the digits of the key in base len(glyphs) + 1 are the code of the cell
+    before the run and the codes of the cells. The last code is a sentinel
+    which pads the frame; as the code before the run it differs from every
+    prefix, as a cell it is empty. A prefix is printed only where it differs
+    from the prefix of the cell before
+    """
+    sentinel = len(glyphs)
+    prefixes = [prefix for prefix, _ in glyphs] + [None]
+    cells = [
+        (prefix if prefix and prefix != prefixes[previous] else '') + char
+        for previous in range(sentinel + 1)
+        for prefix, char in glyphs + (('', ''),)
+    ]
+    table = [''] * (sentinel + 1)
+    for _ in range(run_length):
+        table = [text + cells[key % (sentinel + 1) * (sentinel + 1) + code]
+                 for key, text in enumerate(table)
+                 for code in range(sentinel + 1)]
+    return table
+
+
+def _widen(codes: bytes) -> bytearray:
+    """
+    Returns the codes as big-endian 16-bit integers
+    """
+    wide = bytearray(2 * len(codes))
+    wide[1::2] = codes
+    return wide
+
+
+def compose_frame(heights: typing.Sequence[int], rows: int, cell_height,
+                  glyphs: typing.Sequence[typing.Tuple[str, str]],
+                  row_end: typing.Tuple[str, str]) -> str:
+    """
+    Composes the full frame of the columns of the heights in bulk instead of
+    cell by cell: the frame is one join of the texts of the runs of a few
+    cells looked up by their keys
+    :param glyphs: (prefix, character) pairs of the cells filled with 0 to
+    cell_height units; the prefix (e.g. a color escape sequence) is printed
+    only where a run of the cells with this prefix starts
+    :param row_end: (prefix, character) pair which ends every row
+    """
+    glyphs = tuple(glyphs) + (row_end,)
+    sentinel = len(glyphs)
+    codes_count = sentinel + 1
+    run_length = _run_length(codes_count)
+    row_end_code = bytes((sentinel - 1,))
+    codes = (row_end_code.join(fill_rows(heights, rows, cell_height)) +
+             row_end_code)
+    codes += bytes((sentinel,)) * (-len(codes) % run_length)
+    previous = bytes((sentinel,)) + codes[:-1]
+    # The keys of all the runs are computed at once as the digits of big
+    # integers with 16-bit lanes, which never carry
+    keys = int.from_bytes(_widen(previous[::run_length]), 'big')
+    for offset in range(run_length):
+        keys = keys * codes_count + int.from_bytes(
+            _widen(codes[offset::run_length]), 'big'
+        )
+    keys = array.array('H', keys.to_bytes(2 * len(codes) // run_length,
+                                          'big'))
+    if sys.byteorder == 'little':
+        keys.byteswap()
+    return ''.join(map(_run_table(glyphs, run_length).__getitem__, keys))
@@ -0,0 +1,96 @@
+import array
+import collections
+import typing
+
+# Seconds spent on one printed frame: running the sorting algorithm since
+# the previous frame, building the frame, checking for a terminal resizing,
+# writing the frame to the sink and sleeping after it; and the size of the
+# frame in bytes
+FrameStats = collections.namedtuple(
+    'FrameStats', ('algorithm', 'build', 'resize', 'write', 'sleep', 'bytes')
+)
+PHASES = FrameStats._fields[:-1]
+
+PERCENTILES = (50, 90, 99)
+# Upper bounds of the histogram buckets in seconds, the last bucket is open
+HISTOGRAM_BOUNDS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1)
+HISTOGRAM_LABELS = ('<1us', '<10us', '<100us', '<1ms', '<10ms', '<100ms',
+                    '>=100ms')
+
+
+def percentile(sorted_samples: typing.Sequence[float], percent) -> float:
+    """
+    Returns the nearest-rank percentile of the sorted samples
+    """
+    if not sorted_samples:
+        return 0
+    rank = -(-percent * len(sorted_samples) // 100)
+    return sorted_samples[max(rank, 1) - 1]
+
+
+class FrameProfiler:
+    """
+    Frame hook which collects the FrameStats of every printed frame and
+    reports their totals, percentiles and histograms
+    """
+
+    def __init__(self):
+        self.__samples = {field: array.array('d')
+                          for field in FrameStats._fields}
+
+    def __call__(self, stats: FrameStats):
+        for samples, value in zip(self.__samples.values(), stats):
+            samples.append(value)
+
+    @property
+    def frames(self) -> int:
+        return len(self.__samples['bytes'])
+
+    def total(self, field: str) -> float:
+        return sum(self.__samples[field])
+
+    def histogram(self, phase: str) -> typing.List[int]:
+        """
+        Returns the counts of the frames in every HISTOGRAM_BOUNDS bucket
+        """
+        counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        for seconds in self.__samples[phase]:
+            bucket = 0
+            while (bucket < len(HISTOGRAM_BOUNDS) and
+                   seconds >= HISTOGRAM_BOUNDS[bucket]):
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    def report(self) -> str:
+        """
+        Returns the profile as a printable table
+        """
+        if not self.frames:
+            return 'No frames were profiled'
+        frame_bytes = sorted(self.__samples['bytes'])
+        lines = [
+            f'Profiled {self.frames} frames, {int(sum(frame_bytes))} bytes '
+            f'(' + ', '.join(
+                f'p{percent} {int(percentile(frame_bytes, percent))}'
+                for percent in PERCENTILES
+            ) + f', max {int(frame_bytes[-1])} bytes per frame)',
+            f'{"phase":<10}{"total s":>12}' + ''.join(
+                f'{f"p{percent} ms":>10}' for percent in PERCENTILES
+            ) + f'{"max ms":>10}',
+        ]
+        for phase in PHASES:
+            samples = sorted(self.__samples[phase])
+            lines.append(f'{phase:<10}{sum(samples):>12.6f}' + ''.join(
+                f'{percentile(samples, percent) * 1000:>10.4f}'
+                for percent in PERCENTILES
+            ) + f'{samples[-1] * 1000:>10.4f}')
+        lines.append('Frames per time bucket:')
+        lines.append(f'{"phase":<10}' + ''.join(
+            f'{label:>9}' for label in HISTOGRAM_LABELS
+        ))
+        for phase in PHASES:
+            lines.append(f'{phase:<10}' + ''.join(
+                f'{count:>9}' for count in self.histogram(phase)
+            ))
+        return '\n'.join(lines)
@@ -0,0 +1,119 @@
+import typing
+
+from frame_composer import fill_rows
+
+BACKGROUND_CELL = 0
+
+
+class ColumnFramebuffer:
+    """
+    Persistent grid of cells where every column is a bar growing from the
+    bottom. Rows are stored as bytearrays of cell codes; a column update
+    touches only the cells of that column and a row is translated into
+    characters again only if one of its cells changed
+    """
+
+    def __init__(self, width: int, height: int, glyphs: typing.Sequence[str],
+                 encoding='utf-8'):
+        """
+        :param width: Count of columns
+        :param height: Count of rows
+        :param glyphs: Characters of the cell codes; glyphs[0] is the
+        background
+        :param encoding: Encoding of the rendered rows
+        """
+        self.width = width
+        self.height = height
+        self.__table = {code: glyph for code, glyph in enumerate(glyphs)}
+        self.__encoding = encoding
+        self.__rows = [bytearray(width) for _ in range(height)]
+        self.__row_cache = [None] * height
+        self.__heights = [0] * width
+        self.__codes = [BACKGROUND_CELL] * width
+        self.__top_codes = [BACKGROUND_CELL] * width
+
+    def set_column(self, column: int, height: int, code: int,
+                   top_code=BACKGROUND_CELL):
+        """
+        Draws the column as a bar of the given height filled with the code.
+        The cell above the bar gets the top_code, so the bar can end with a
+        partially filled cell
+        """
+        height = min(height, self.height)
+        if height == self.height:
+            top_code = BACKGROUND_CELL
+        old_height = self.__heights[column]
+        old_code = self.__codes[column]
+        old_top_code = self.__top_codes[column]
+        if (height == old_height and code == old_code and
+                top_code == old_top_code):
+            return
+        top = self.height - height
+        # Rows above both bars and their top cells stay background
+        start = self.height - max(height + (top_code != BACKGROUND_CELL),
+                                  old_height + (old_top_code !=
+                                                BACKGROUND_CELL))
+        if code == old_code:
+            # Only the difference between the bars has to be redrawn
+            end = self.height - min(height, old_height)
+        else:
+            end = self.height
+        rows = self.__rows
+        row_cache = self.__row_cache
+        for row in range(start, end):
+            if row >= top:
+                rows[row][column] = code
+            elif row == top - 1:
+                rows[row][column] = top_code
+            else:
+                rows[row][column] = BACKGROUND_CELL
+            row_cache[row] = None
+        self.__heights[column] = height
+        self.__codes[column] = code
+        self.__top_codes[column] = top_code
+
+    def set_columns(self, start: int, heights: typing.Sequence[int],
+                    code: int, cell_height=1, top_code=BACKGROUND_CELL):
+        """
+        Draws the columns from the start one as bars of the heights filled
+        with the code, building every row in bulk
+        :param heights: Heights of the bars in 1 / cell_height cells
+        :param top_code: Code of the top cell filled with one unit, the
+        codes of the fuller top cells follow it
+        """
+        if not heights:
+            return
+        stop = start + len(heights)
+        table = bytes((BACKGROUND_CELL,) +
+                      tuple(range(top_code, top_code + cell_height - 1)) +
+                      (code,))
+        table += bytes(256 - len(table))
+        for row, fills in zip(self.__rows,
+                              fill_rows(heights, self.height, cell_height)):
+            row[start:stop] = fills.translate(table)
+        self.__row_cache[:] = [None] * self.height
+        for column, height in enumerate(heights, start):
+            cells, fill = divmod(min(height, self.height * cell_height),
+                                 cell_height)
+            self.__heights[column] = cells
+            self.__codes[column] = code
+            self.__top_codes[column] = (top_code + fill - 1 if fill
+                                        else BACKGROUND_CELL)
+
+    def column_code(self, column: int) -> int:
+        return self.__codes[column]
+
+    def render_rows(self) -> typing.List[bytes]:
+        """
+        Returns the encoded rows, translating only the changed ones
+        """
+        row_cache = self.__row_cache
+        for row, cached in enumerate(row_cache):
+            if cached is None:
+                row_cache[row] = self.__rows[row].decode('latin-1').translate(
+                    self.__table
+                ).encode(self.__encoding)
+        return row_cache
+
+    def render(self) -> bytes:
+        return b'\n'.join(self.render_rows()) + b'\n'
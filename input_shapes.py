@@ -0,0 +1,356 @@
+import array
+import bisect
+import math
+import random
+import sys
+import typing
+
+from sorting_algorithms import choose_pivot
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpy = None
+
+# Bits of the random words the values are scaled from
+WORD_BITS = 32
+# Values of the numpy arrays must fit into int64
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+DEFAULT_UNIQUE_VALUES = 5
+DEFAULT_TEETH = 4
+
+# Separates the name of the shape from its parameter, e.g. sawtooth:8
+SHAPE_PARAMETER_SEPARATOR = ':'
+
+
+def _words(count: int, rng: random.Random):
+    """
+    Returns the count of random WORD_BITS-bit words drawn from the generator
+    at once, the same with and without numpy
+    """
+    data = rng.getrandbits(WORD_BITS * count).to_bytes(
+        WORD_BITS // 8 * count, 'little'
+    ) if count else b''
+    if numpy is not None:
+        return numpy.frombuffer(data, dtype='<u4').astype(numpy.uint64)
+    words = array.array('I')
+    if words.itemsize != WORD_BITS // 8:
+        words = array.array('L')
+    words.frombytes(data)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+def _vectorized(min_val, max_val) -> bool:
+    return numpy is not None and _INT64_MIN <= min_val <= max_val <= _INT64_MAX
+
+
+def _uniform(min_val, max_val, count, rng):
+    """
+    Returns the count of uniform random values from min_val to max_val: a
+    numpy array if numpy is installed, otherwise a list
+    """
+    span = max_val - min_val + 1
+    if span > 1 << WORD_BITS:
+        return [rng.randint(min_val, max_val) for _ in range(count)]
+    # The words are scaled to the span by a multiplication and a shift
+    # instead of a division per value
+    words = _words(count, rng)
+    if _vectorized(min_val, max_val):
+        return ((words * numpy.uint64(span)) >> numpy.uint64(WORD_BITS)
+                ).astype(numpy.int64) + min_val
+    return [min_val + (word * span >> WORD_BITS) for word in words.tolist()]
+
+
+def _sort(values):
+    if isinstance(values, list):
+        return sorted(values)
+    return numpy.sort(values)
+
+
+def _concatenate(first, second):
+    if isinstance(first, list):
+        return first + second
+    return numpy.concatenate((first, second))
+
+
+def _random_shape(min_val, max_val, length, rng, parameter):
+    return _uniform(min_val, max_val, length, rng)
+
+
+def _sorted_shape(min_val, max_val, length, rng, parameter):
+    return _sort(_uniform(min_val, max_val, length, rng))
+
+
+def _reversed_shape(min_val, max_val, length, rng, parameter):
+    return _sort(_uniform(min_val, max_val, length, rng))[::-1]
+
+
+def _nearly_sorted_shape(min_val, max_val, length, rng, swaps):
+    """
+    Sorted values with the swaps of random pairs, by default the square
+    root of the length of them
+    """
+    values = _sort(_uniform(min_val, max_val, length, rng))
+    if not length:
+        return values
+    if swaps is None:
+        swaps = math.isqrt(length)
+    indices = [int(index) for index in _uniform(0, length - 1, 2 * swaps,
+                                                 rng)]
+    for i, j in zip(indices[::2], indices[1::2]):
+        values[i], values[j] = values[j], values[i]
+    return values
+
+
+def _few_unique_shape(min_val, max_val, length, rng, unique_values):
+    """
+    Random picks from DEFAULT_UNIQUE_VALUES or unique_values random values
+    """
+    unique_values = _uniform(min_val, max_val,
+                             unique_values or DEFAULT_UNIQUE_VALUES, rng)
+    indices = _uniform(0, len(unique_values) - 1, length, rng)
+    if isinstance(unique_values, list):
+        return [unique_values[index] for index in indices]
+    return unique_values[indices]
+
+
+def _organ_pipe_shape(min_val, max_val, length, rng, parameter):
+    """
+    Random values ascending up to the middle and descending after it
+    """
+    values = _sort(_uniform(min_val, max_val, length, rng))
+    return _concatenate(values[0::2], values[1::2][::-1])
+
+
+def _sawtooth_shape(min_val, max_val, length, rng, teeth):
+    """
+    DEFAULT_TEETH or teeth ascending runs of random values
+    """
+    values = _uniform(min_val, max_val, length, rng)
+    teeth = min(teeth or DEFAULT_TEETH, max(length, 1))
+    bounds = [tooth * length // teeth for tooth in range(teeth + 1)]
+    for start, stop in zip(bounds, bounds[1:]):
+        values[start:stop] = _sort(values[start:stop])
+    return values
+
+
+class _AdversaryItem:
+    __slots__ = ('adversary', 'label')
+
+    def __init__(self, adversary: '_PivotAdversary', label: int):
+        self.adversary = adversary
+        self.label = label
+
+    def __lt__(self, other: '_AdversaryItem') -> bool:
+        return self.adversary.compare(self.label, other.label) < 0
+
+
+class _PivotAdversary:
+    """
+    McIlroy's adversary against the quick sort which takes the pivot with
+    choose_pivot (the median of three or the ninther, as the introsort
+    does). The items are labeled by their initial positions and start as
+    "gas", which is greater than any value; an item gets its rank (freezes)
+    only when two gas items are compared, and the rank is chosen so the
+    partitions are as unbalanced as possible.
+    Comparisons of gas items with the frozen pivot don't change anything
+    but the candidate to freeze, so the partitioning skips the gas runs
+    instead of scanning them and the ranks of the length items are found in
+    about linear time instead of the quadratic time of the sorting
+    """
+
+    def __init__(self, length: int):
+        self.__gas = length
+        self.__ranks = [length] * length
+        self.__frozen = 0
+        self.__candidate = 0
+        # Labels of the items at the positions and positions of the labels
+        self.__labels = list(range(length))
+        self.__positions = list(range(length))
+        # Sorted positions of the frozen items of the unsorted part
+        self.__frozen_positions = []
+
+    def __freeze(self, label):
+        self.__ranks[label] = self.__frozen
+        self.__frozen += 1
+        bisect.insort(self.__frozen_positions, self.__positions[label])
+
+    def __is_frozen(self, label) -> bool:
+        return self.__ranks[label] != self.__gas
+
+    def __move_frozen(self, old, new):
+        frozen_positions = self.__frozen_positions
+        del frozen_positions[bisect.bisect_left(frozen_positions, old)]
+        bisect.insort(frozen_positions, new)
+
+    def compare(self, label, other_label) -> int:
+        if not (self.__is_frozen(label) or self.__is_frozen(other_label)):
+            self.__freeze(label if label == self.__candidate
+                          else other_label)
+        if not self.__is_frozen(label):
+            self.__candidate = label
+        elif not self.__is_frozen(other_label):
+            self.__candidate = other_label
+        return self.__ranks[label] - self.__ranks[other_label]
+
+    def __getitem__(self, position) -> _AdversaryItem:
+        return _AdversaryItem(self, self.__labels[position])
+
+    def __setitem__(self, position, item: _AdversaryItem):
+        old = self.__positions[item.label]
+        self.__labels[position] = item.label
+        self.__positions[item.label] = position
+        if self.__is_frozen(item.label) and old != position:
+            self.__move_frozen(old, position)
+
+    def __swap(self, i, j):
+        label, other_label = self.__labels[i], self.__labels[j]
+        self.__labels[i], self.__labels[j] = other_label, label
+        self.__positions[label], self.__positions[other_label] = j, i
+        if self.__is_frozen(label) != self.__is_frozen(other_label):
+            if self.__is_frozen(label):
+                self.__move_frozen(i, j)
+            else:
+                self.__move_frozen(j, i)
+
+    def __partition(self, left, right) -> int:
+        """
+        Same as sorting_algorithms._partition
+        """
+        labels = self.__labels
+        pivot = labels[(left + right) // 2]
+        while left <= right:
+            while self.compare(labels[left], pivot) < 0:
+                left += 1
+            while True:
+                if self.__is_frozen(pivot):
+                    # The gas items after the nearest frozen one are greater
+                    # than the pivot, the last of them is the candidate
+                    frozen_positions = self.__frozen_positions
+                    nearest = frozen_positions[
+                        bisect.bisect_right(frozen_positions, right) - 1
+                    ]
+                    if nearest < right:
+                        self.__candidate = labels[nearest + 1]
+                        right = nearest
+                if not self.compare(labels[right], pivot) > 0:
+                    break
+                right -= 1
+            if left >= right:
+                break
+            self.__swap(left, right)
+            left += 1
+            right -= 1
+        return right
+
+    def ranks(self) -> typing.List[int]:
+        """
+        Sorts the items with the quick sort and returns the ranks of the
+        items at the initial positions
+        """
+        length = self.__gas
+        # The left parts are sorted first, so the positions before the
+        # popped partition are sorted and their frozen items are forgotten
+        stack = [(0, length - 1)]
+        while stack:
+            left, right = stack.pop()
+            del self.__frozen_positions[
+                :bisect.bisect_left(self.__frozen_positions, left)
+            ]
+            if left >= right:
+                continue
+            choose_pivot(self, left, right)
+            support = self.__partition(left, right)
+            stack.append((support + 1, right))
+            stack.append((left, support))
+        for label in range(length):
+            if not self.__is_frozen(label):
+                self.__freeze(label)
+        return self.__ranks
+
+
+def _quicksort_killer_shape(min_val, max_val, length, rng, parameter):
+    """
+    Adversarial input of the median of three quick sort: the pivots split
+    off only a few items, so it takes quadratic time and the introsort falls
+    back to the heapsort. The ranks are scaled to the values, ties weaken
+    the adversary if there are fewer values than items. The seed isn't used
+    """
+    ranks = _PivotAdversary(length).ranks()
+    scale = max(length - 1, 1)
+    span = max_val - min_val
+    if _vectorized(min_val, max_val) and span < (1 << 63) // scale:
+        ranks = numpy.asarray(ranks, dtype=numpy.int64)
+        return ranks * span // scale + min_val
+    return [min_val + rank * span // scale for rank in ranks]
+
+
+INPUT_SHAPES = {
+    'random': _random_shape,
+    'sorted': _sorted_shape,
+    'reversed': _reversed_shape,
+    'nearly_sorted': _nearly_sorted_shape,
+    'few_unique': _few_unique_shape,
+    'organ_pipe': _organ_pipe_shape,
+    'sawtooth': _sawtooth_shape,
+    'quicksort_killer': _quicksort_killer_shape,
+}
+# Shapes which take an integer parameter after SHAPE_PARAMETER_SEPARATOR
+PARAMETRIC_SHAPES = {
+    'nearly_sorted': 'count of the swaps',
+    'few_unique': 'count of the distinct values',
+    'sawtooth': 'count of the teeth',
+}
+
+
+def parse_shape(shape: str) -> typing.Tuple[str, typing.Optional[int]]:
+    """
+    Splits the shape into the name and the parameter
+    :raise ValueError: If there is no such shape or the parameter isn't a
+    positive integer
+    """
+    name, separator, parameter = shape.partition(SHAPE_PARAMETER_SEPARATOR)
+    if name not in INPUT_SHAPES:
+        raise ValueError(f'Unknown input shape {name}')
+    if not separator:
+        return name, None
+    if name not in PARAMETRIC_SHAPES:
+        raise ValueError(f'The {name} input shape takes no parameter')
+    try:
+        parameter = int(parameter)
+    except ValueError:
+        parameter = 0
+    if not parameter > 0:
+        raise ValueError(f'The parameter of the {name} input shape must be '
+                         f'an integer greater than 0')
+    return name, parameter
+
+
+def generate_array(
+        shape: str, min_val: int, max_val: int, length: int,
+        seed: typing.Optional[int] = None
+) -> typing.List[int]:
+    """
+    Creates array of the input shape. The random values are drawn from the
+    generator in bulk and processed with numpy if it's installed; the same
+    seed gives the same array either way
+    :param shape: Name of the shape from INPUT_SHAPES, optionally with the
+    parameter, e.g. sawtooth:8
+    :param min_val: Minimal value to generate
+    :param max_val: Maximal value to generate
+    :param length: Length of the generating array
+    :param seed: Seed of the random generator; the same seed gives the same
+    array
+    :return: Array of numbers
+    :raise ValueError: If the shape can't be parsed
+    """
+    name, parameter = parse_shape(shape)
+    values = INPUT_SHAPES[name](min_val, max_val, length,
+                                random.Random(seed), parameter)
+    if isinstance(values, list):
+        return values
+    return values.tolist()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import sys
+import time
+import typing
+
+import terminal_utils
+
+FLUSH_EVERY_FRAME = 'frame'
+FLUSH_EVERY_N_BYTES = 'bytes'
+FLUSH_EVERY_TICK = 'tick'
+FLUSH_POLICIES = (FLUSH_EVERY_FRAME, FLUSH_EVERY_N_BYTES, FLUSH_EVERY_TICK)
+
+DEFAULT_FLUSH_BYTES = 1 << 16
+DEFAULT_FLUSH_INTERVAL = 1 / 60
+
+
+class OutputSink:
+    """
+    Output of the renderers. Frames are encoded once and appended to a
+    reusable buffer which is written to the terminal file descriptor with
+    os.write according to the flush policy:
+    'frame' - after every frame,
+    'bytes' - when the buffer reaches flush_bytes,
+    'tick' - when flush_interval seconds passed since the last write
+    """
+
+    def __init__(self, stream=None, policy=FLUSH_EVERY_FRAME,
+                 flush_bytes=DEFAULT_FLUSH_BYTES,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f'Unknown flush policy {policy}')
+        self.__stream = stream if stream is not None else sys.stdout
+        self.__encoding = self.__stream.encoding or 'utf-8'
+        # colorama converts escape sequences by wrapping sys.stdout on
+        # Windows, so the stream must not be bypassed there
+        self.__fd = None if os.name == 'nt' else self.__stream.fileno()
+        self.__policy = policy
+        self.__flush_bytes = flush_bytes
+        self.__flush_interval = flush_interval
+        self.__last_flush_time = time.perf_counter()
+        self.__buffer = bytearray()
+        self.bytes_written = 0
+        self.syscalls = 0
+
+    def write(self, data: typing.Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode(self.__encoding)
+        self.__buffer += data
+        if (self.__policy == FLUSH_EVERY_N_BYTES and
+                len(self.__buffer) >= self.__flush_bytes):
+            self.flush()
+
+    def end_frame(self):
+        """
+        Marks the end of a frame and flushes the buffer if the policy says so
+        """
+        if self.__policy == FLUSH_EVERY_FRAME:
+            self.flush()
+        elif self.__policy == FLUSH_EVERY_TICK:
+            if (time.perf_counter() - self.__last_flush_time >=
+                    self.__flush_interval):
+                self.flush()
+
+    is_terminal = True
+
+    def terminal_size(self) -> os.terminal_size:
+        return shutil.get_terminal_size()
+
+    def clear(self):
+        """
+        Clears the terminal
+        """
+        self.flush()
+        terminal_utils.clear_terminal()
+
+    def time(self) -> float:
+        """
+        Clock of the output used to pace the frames
+        """
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def flush(self):
+        """
+        Writes the whole buffer to the terminal
+        """
+        self.__last_flush_time = time.perf_counter()
+        if not self.__buffer:
+            return
+        # Text written with print() must come out first
+        self.__stream.flush()
+        if self.__fd is None:
+            self.__stream.write(self.__buffer.decode(self.__encoding))
+            self.__stream.flush()
+            self.syscalls += 1
+            self.bytes_written += len(self.__buffer)
+        else:
+            with memoryview(self.__buffer) as view:
+                offset = 0
+                while offset < len(view):
+                    written = os.write(self.__fd, view[offset:])
+                    self.syscalls += 1
+                    offset += written
+            self.bytes_written += len(self.__buffer)
+        self.__buffer.clear()
@@ -1,23 +1,48 @@
 import argparse
+import json
+import os
 import random
-import runpy
 import shutil
 import time
 import typing
 
 import terminal_utils
-from access_printer_list import choose_access_printer_list_class
+from access_printer_list import (BACKEND_ANSI, BACKEND_AUTO, BACKEND_CURSES,
+                                 BACKEND_PLAIN, BACKENDS, SUBCELL_STEPS,
+                                 choose_access_printer_list_class)
+from access_trace import record_trace, render_trace
+from asciicast import AsciicastSink
+from benchmark import count_accesses, run_benchmark
+from binned_list import AGGREGATES, BinnedList, bin_size
+from frame_profiler import FrameProfiler
+from input_shapes import (INPUT_SHAPES, PARAMETRIC_SHAPES,
+                          SHAPE_PARAMETER_SEPARATOR, generate_array,
+                          parse_shape)
+from race import PANE_SEPARATOR, run_race
+from render_queue import (BACKPRESSURE_POLICIES, DEFAULT_QUEUE_SIZE,
+                          EventRing, QueuedList, RenderThread, RingClosed)
+from output_sink import DEFAULT_FLUSH_BYTES, FLUSH_POLICIES, OutputSink
+from sandbox import SandboxError, resource, run_sandboxed
+from stepping import run_stepping_race
 from singleton import Singleton
-from sorting_algorithms import SORTING_ALGORITHMS
+from trace_file import save_trace
+from sorting_algorithms import SORTING_ALGORITHMS, load_sorting_functions
 
 DEFAULT_MINIMUM = 1
 DEFAULT_DELAY = 1
+DEFAULT_DURATION_FPS = 60
+
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60}
+SIZE_UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
 
 # The text will be formatted by argparse
 DESCRIPTION = '''
 Visualization of sorting algorithms in a terminal. For better visualization you 
 need to install the "colorama" python package (with it, the program uses ANSI 
-escape sequences for faster rendering and color rendering)
+escape sequences for faster rendering and color rendering). Run with the 
+"matrix" subcommand to benchmark many algorithms, lengths and input shapes at 
+once and with the "replay" subcommand to replay a trace saved with 
+--save-trace
 '''
 ALGORITHM_ARG_HELP = '''
 Sorting algorithm which be visualized. You may choose one of the builtin 
@@ -38,6 +63,16 @@ LENGTH_HELP = '''
 Count of the array elements. Must be greater, than 0. By default it's equal to 
 half of the width of the terminal
 '''
+SHAPE_HELP = '''
+Input shape of the generating array: {shapes}. The {parametric} shapes may 
+take an integer parameter after "{separator}" ({parameters}), e.g. 
+sawtooth{separator}8. By default is random
+'''
+SEED_HELP = '''
+Seed of the generating array, so a run can be reproduced. By default a random 
+seed is chosen; it's printed after the sorting and stored with --headless, 
+--save-trace and --cast
+'''
 NO_COLORAMA_HELP = 'Disables the use of colorama, even if it is installed'
 DELAY_HELP = '''
 Delay in ms after printing one 'frame'; some terminals are printing too fast, 
@@ -48,6 +83,116 @@ Run sorting visualization in full-screen mode (set the --length and --max
 parameters equal to the size of the terminal). Specifying these parameters 
 manually will overwrite the set values
 '''
+FPS_HELP = '''
+Coalesce accesses and print at most FPS frames per second. Each frame shows 
+every element accessed since the previous one; --delay is still accounted per 
+access, but the sleeping happens once per frame
+'''
+FLUSH_HELP = '''
+When the buffered output is written to the terminal: after every frame 
+("frame", the default), when --flush-bytes bytes are buffered ("bytes") or 
+at most 60 times per second ("tick")
+'''
+FLUSH_BYTES_HELP = f'''
+Buffer size for the "bytes" --flush policy. By default is {DEFAULT_FLUSH_BYTES}
+'''
+HEADLESS_HELP = '''
+Run the sorting algorithm without any terminal output and print its wall 
+time and counts of reads, writes and comparisons as JSON. --length, --min and 
+--max are not limited by the terminal size in this mode
+'''
+BIN_HELP = '''
+Large arrays mode: bins the array elements into the terminal columns, every 
+column shows the maximum or the mean of its bucket scaled to the terminal 
+height. --length and --max are not limited by the terminal size in this mode
+'''
+RACE_HELP = '''
+Race mode: --algorithm is a comma-separated list of algorithms which sort 
+copies of the same array at the same time, each in its own worker process 
+and its own pane of the screen. By default the array length is equal to the 
+pane width
+'''
+STEPPING_HELP = '''
+With --race, runs the algorithms as generators of access events which an 
+asyncio scheduler interleaves in this process instead of worker processes. 
+Plain sorting functions are adapted by recording their accesses before the 
+race starts and replaying them step by step
+'''
+SAVE_TRACE_HELP = '''
+Record the access trace like --record does and also save it to the file, so 
+it can be replayed from any position with the "replay" subcommand
+'''
+CAST_HELP = '''
+Export the visualization to an asciinema v2 .cast file instead of the 
+terminal. Delays only set the timestamps of the recording, so the export runs 
+as fast as possible. Needs the ansi backend, since full plain frames would 
+scroll in the player
+'''
+CAST_SIZE_HELP = '''
+Terminal size of the --cast recording as COLUMNSxLINES. By default it's equal 
+to the size of your terminal
+'''
+RENDER_THREAD_HELP = '''
+Render in a separate thread: the sorting algorithm pushes its accesses into 
+a bounded queue which the render thread drains, so the algorithm can run 
+ahead of the terminal
+'''
+QUEUE_SIZE_HELP = f'''
+Capacity of the --render-thread queue. By default is {DEFAULT_QUEUE_SIZE}
+'''
+BACKPRESSURE_HELP = '''
+What the sorting algorithm does when the --render-thread queue is full: 
+waits for the render thread ("block", the default), drops reads and waits 
+only on writes ("drop") or drops reads and merges writes to the same element 
+("coalesce")
+'''
+DURATION_HELP = f'''
+Total duration of the visualization, e.g. 10s, 500ms or 2m. The sorting 
+algorithm is run once without output to count its accesses, then the delay 
+is set so that the visualization takes about the duration and accesses are 
+merged into at most --fps frames per second (by default 
+{DEFAULT_DURATION_FPS}). Overrides --delay
+'''
+SWEEP_STEP_HELP = '''
+Count of the elements the sorting completion animation advances by in one 
+frame. By default is 1
+'''
+BACKEND_HELP = '''
+How the visualization is drawn: with ANSI escape sequences ("ansi", needs 
+colorama), with full frames of plain characters ("plain"), with the 
+standard curses module which computes the minimal terminal updates itself 
+("curses") or with ANSI escape sequences if colorama is installed ("auto", 
+the default)
+'''
+SUBCELL_HELP = f'''
+Draw the column tops with the eighth blocks, so one terminal row holds 
+{SUBCELL_STEPS} values and --max may be up to {SUBCELL_STEPS} times the 
+terminal height
+'''
+SANDBOX_HELP = '''
+Run the sorting algorithm in a child process which sorts a shared memory 
+copy of the array and sends its accesses to the visualizer, so a slow or 
+crashing algorithm can't block or kill the visualization
+'''
+TIMEOUT_HELP = '''
+Limit of the wall time of the --sandbox sorting in seconds, including the 
+time spent waiting for the visualization. Where the platform supports it, the 
+CPU time of the sorting process is limited to the same value as well
+'''
+MEMORY_LIMIT_HELP = '''
+Limit of the memory of the --sandbox process, e.g. 512M or 2G (bytes by 
+default)
+'''
+PROFILE_HELP = '''
+Measure the time every frame spends on the sorting algorithm, building the 
+frame, checking for a terminal resizing, writing and sleeping, and the bytes 
+it emits; the percentiles and histograms are printed after the sorting
+'''
+RECORD_HELP = '''
+Run the sorting algorithm against a recorder first and render the recorded 
+access trace afterwards. The algorithm is then timed on its own, without the 
+terminal output
+'''
 
 
 def print_terminal_size(columns=None, lines=None):
@@ -56,17 +201,32 @@ def print_terminal_size(columns=None, lines=None):
     print(f'Your terminal size is ({columns}, {lines})')
 
 
-def create_array(
-        min_val: int, max_val: int, length: int
-) -> typing.List[int]:
+def parse_duration(duration: str) -> float:
+    """
+    Parses the duration with an optional unit of DURATION_UNITS, seconds by
+    default
+    :return: Duration in seconds
+    :raise ValueError: If the duration can't be parsed
+    """
+    duration = duration.strip()
+    # 'ms' must be checked before 's'
+    for unit, seconds in sorted(DURATION_UNITS.items(),
+                                key=lambda item: -len(item[0])):
+        if duration.endswith(unit):
+            return float(duration[:-len(unit)]) * seconds
+    return float(duration)
+
+
+def parse_size(size: str) -> int:
     """
-    Creates array of random numbers
-    :param min_val: Minimal value to generate
-    :param max_val: Maximal value to generate
-    :param length: Length of the generating array
-    :return: Array of random numbers
+    Parses the size with an optional unit of SIZE_UNITS, bytes by default
+    :return: Size in bytes
+    :raise ValueError: If the size can't be parsed
     """
-    return [random.randint(min_val, max_val) for _ in range(length)]
+    size = size.strip().upper()
+    if size[-1:] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
 
 
 class Program(Singleton):
@@ -82,9 +242,24 @@ class Program(Singleton):
         self._min_element = None
         self._max_element = None
         self._array_length = None
+        # Seed of the generating array, --seed or a random one
+        self._seed = None
 
         # Function which be used for array sorting
         self._sorting_function = None
+        # Algorithms names of the race mode
+        self._race_algorithms = None
+        self._pane_width = None
+        # Size of the --cast recording
+        self._cast_size = None
+        # Delay in seconds and frames per second of the visualization,
+        # changed by --duration
+        self._delay = None
+        self._fps = None
+        # --duration in seconds
+        self._duration = None
+        # --memory-limit in bytes
+        self._memory_limit = None
 
     def _init_parser(self):
         """
@@ -116,6 +291,24 @@ class Program(Singleton):
             dest='length'
         )
 
+        self._parser.add_argument(
+            '--shape',
+            default='random',
+            help=SHAPE_HELP.format(
+                shapes=', '.join(INPUT_SHAPES),
+                parametric=', '.join(PARAMETRIC_SHAPES),
+                separator=SHAPE_PARAMETER_SEPARATOR,
+                parameters=', '.join(PARAMETRIC_SHAPES.values())
+            ),
+            dest='shape'
+        )
+        self._parser.add_argument(
+            '--seed',
+            help=SEED_HELP,
+            type=int,
+            dest='seed'
+        )
+
         self._parser.add_argument(
             '--delay', '-d',
             default=DEFAULT_DELAY,
@@ -124,6 +317,28 @@ class Program(Singleton):
             dest='delay'
         )
 
+        self._parser.add_argument(
+            '--fps',
+            help=FPS_HELP,
+            type=float,
+            dest='fps'
+        )
+
+        self._parser.add_argument(
+            '--flush',
+            default=FLUSH_POLICIES[0],
+            choices=FLUSH_POLICIES,
+            help=FLUSH_HELP,
+            dest='flush'
+        )
+        self._parser.add_argument(
+            '--flush-bytes',
+            default=DEFAULT_FLUSH_BYTES,
+            help=FLUSH_BYTES_HELP,
+            type=int,
+            dest='flush_bytes'
+        )
+
         self._parser.add_argument(
             '-a', '--algorithm',
             default=self._sorting_algorithms_names[0],
@@ -146,6 +361,184 @@ class Program(Singleton):
             dest='no_colorama',
             action='store_true'
         )
+        self._parser.add_argument(
+            '--headless', '--bench',
+            help=HEADLESS_HELP,
+            dest='headless',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--bin',
+            choices=AGGREGATES,
+            help=BIN_HELP,
+            dest='bin'
+        )
+        self._parser.add_argument(
+            '--race',
+            help=RACE_HELP,
+            dest='race',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--stepping',
+            help=STEPPING_HELP,
+            dest='stepping',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--save-trace',
+            help=SAVE_TRACE_HELP,
+            dest='save_trace'
+        )
+        self._parser.add_argument(
+            '--cast',
+            help=CAST_HELP,
+            dest='cast'
+        )
+        self._parser.add_argument(
+            '--cast-size',
+            help=CAST_SIZE_HELP,
+            dest='cast_size'
+        )
+        self._parser.add_argument(
+            '--render-thread',
+            help=RENDER_THREAD_HELP,
+            dest='render_thread',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--queue-size',
+            default=DEFAULT_QUEUE_SIZE,
+            help=QUEUE_SIZE_HELP,
+            type=int,
+            dest='queue_size'
+        )
+        self._parser.add_argument(
+            '--backpressure',
+            default=BACKPRESSURE_POLICIES[0],
+            choices=BACKPRESSURE_POLICIES,
+            help=BACKPRESSURE_HELP,
+            dest='backpressure'
+        )
+        self._parser.add_argument(
+            '--record', '-r',
+            help=RECORD_HELP,
+            dest='record',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--duration',
+            help=DURATION_HELP,
+            dest='duration'
+        )
+        self._parser.add_argument(
+            '--sweep-step',
+            default=1,
+            help=SWEEP_STEP_HELP,
+            type=int,
+            dest='sweep_step'
+        )
+        self._parser.add_argument(
+            '--backend',
+            default=BACKEND_AUTO,
+            choices=BACKENDS,
+            help=BACKEND_HELP,
+            dest='backend'
+        )
+        self._parser.add_argument(
+            '--subcell',
+            help=SUBCELL_HELP,
+            dest='subcell',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--sandbox',
+            help=SANDBOX_HELP,
+            dest='sandbox',
+            action='store_true'
+        )
+        self._parser.add_argument(
+            '--timeout',
+            help=TIMEOUT_HELP,
+            type=float,
+            dest='timeout'
+        )
+        self._parser.add_argument(
+            '--memory-limit',
+            help=MEMORY_LIMIT_HELP,
+            dest='memory_limit'
+        )
+        self._parser.add_argument(
+            '--profile',
+            help=PROFILE_HELP,
+            dest='profile',
+            action='store_true'
+        )
+
+    def _create_array(self) -> typing.List[int]:
+        """
+        Creates the array of the --shape from the seed
+        """
+        return generate_array(self._args.shape, self._min_element,
+                              self._max_element, self._array_length,
+                              self._seed)
+
+    @property
+    def _input_info(self) -> typing.Dict[str, typing.Any]:
+        """
+        Shape and seed the array can be generated again from
+        """
+        return {'shape': self._args.shape, 'seed': self._seed}
+
+    def _check_sandbox_args(self) -> bool:
+        """
+        Validates the --sandbox, --timeout and --memory-limit arguments
+        """
+        if not self._args.sandbox:
+            if (self._args.timeout is not None or
+                    self._args.memory_limit is not None):
+                print('Error. --timeout and --memory-limit need --sandbox')
+                return False
+            return True
+        conflicts = {
+            '--race': self._args.race,
+            '--headless': self._args.headless,
+            '--record': self._args.record,
+            '--save-trace': self._args.save_trace,
+            '--render-thread': self._args.render_thread,
+            '--duration': self._args.duration,
+        }
+        for option, value in conflicts.items():
+            if value:
+                print(f'Error. {option} is not supported with --sandbox')
+                return False
+        if self._args.timeout is not None:
+            if not self._args.timeout > 0:
+                print('Error. --timeout must be greater than 0')
+                return False
+        if self._args.memory_limit is not None:
+            if resource is None:
+                print('Error. --memory-limit is not supported on your '
+                      'platform')
+                return False
+            try:
+                self._memory_limit = parse_size(self._args.memory_limit)
+            except ValueError:
+                print('Error. --memory-limit must be a number of bytes with '
+                      'an optional unit: ' + ', '.join(SIZE_UNITS))
+                return False
+            if not self._memory_limit > 0:
+                print('Error. --memory-limit must be greater than 0')
+                return False
+        return True
+
+    def _output_size(self) -> os.terminal_size:
+        """
+        Returns the size of the terminal or the --cast recording
+        """
+        if self._args.cast:
+            return self._cast_size
+        return shutil.get_terminal_size()
 
     def _check_and_proceed_args(self) -> bool:
         """
@@ -157,23 +550,17 @@ class Program(Singleton):
         algorithm = self._args.algorithm
 
         # Checking --algorithm and --script args
-        if algorithm not in self._sorting_algorithms_names:
+        if self._args.race:
+            self._race_algorithms = algorithm.split(',')
+        if not self._args.sandbox:
             script = self._args.script
-            if not script:
-                print(
-                    f'Error. {algorithm} is not a builtin algorithm, so you '
-                    f'must specify --script argument'
+            try:
+                sorting_functions = load_sorting_functions(
+                    self._race_algorithms or (algorithm,), script
                 )
+            except ValueError as exception:
+                print(f'Error. {exception}')
                 return False
-            try:
-                script_dict = runpy.run_path(script)
-                self._sorting_function = script_dict.get(algorithm)
-                if not self._sorting_function:
-                    print(
-                        f'Error. There is no {algorithm} function in the '
-                        f'{script}'
-                    )
-                    return False
             except FileNotFoundError:
                 print(f'Error. File {script} not found')
                 return False
@@ -182,31 +569,108 @@ class Program(Singleton):
                       f'during {script} executing. '
                       f'Additional info: {exception}')
                 return False
-        else:
-            self._sorting_function = SORTING_ALGORITHMS[self._args.algorithm]
+            if not self._args.race:
+                self._sorting_function = sorting_functions[0]
+        elif self._args.script:
+            # The script is run only in the sandbox process
+            if not os.path.isfile(self._args.script):
+                print(f'Error. File {self._args.script} not found')
+                return False
+        elif algorithm not in SORTING_ALGORITHMS:
+            print(f'Error. {algorithm} is not a builtin algorithm and no '
+                  f'script is specified')
+            return False
+
+        if not self._check_sandbox_args():
+            return False
+
+        if self._args.render_thread and (self._args.record or
+                                         self._args.save_trace):
+            print('Error. --render-thread is not supported with --record and '
+                  '--save-trace')
+            return False
+
+        if self._args.stepping and not self._args.race:
+            print('Error. --stepping needs --race')
+            return False
+
+        if self._args.race:
+            conflicts = {
+                '--headless': self._args.headless,
+                '--cast': self._args.cast,
+                '--bin': self._args.bin,
+                '--record': self._args.record,
+                '--save-trace': self._args.save_trace,
+                '--render-thread': self._args.render_thread,
+                '--profile': self._args.profile,
+                '--subcell': self._args.subcell,
+                '--backend': self._args.backend != BACKEND_AUTO,
+            }
+            for option, value in conflicts.items():
+                if value:
+                    print(f'Error. {option} is not supported in the race '
+                          f'mode')
+                    return False
+
+        if self._args.cast:
+            # The plain frames are whole screens written with newlines, they
+            # are huge and scroll in the player instead of redrawing
+            if (self._args.no_colorama or not terminal_utils.colorama or
+                    self._args.backend == BACKEND_PLAIN):
+                print('Error. --cast needs the ansi backend, so it is not '
+                      'supported with --no-colorama, without colorama or '
+                      'with the plain backend')
+                return False
+            if self._args.cast_size:
+                try:
+                    self._cast_size = os.terminal_size(tuple(
+                        int(size) for size in self._args.cast_size.split('x')
+                    ))
+                except (ValueError, TypeError):
+                    print('Error. --cast-size must be in the COLUMNSxLINES '
+                          'format')
+                    return False
+                if not min(self._cast_size) > 0:
+                    print('Error. --cast-size values must be greater than 0')
+                    return False
+            else:
+                self._cast_size = shutil.get_terminal_size()
 
         # Now checking --min, --max and --length args and setting
         # _min_element, _max_element and _array_length fields
-        columns, lines = shutil.get_terminal_size()
+        columns, lines = self._output_size()
+        # Nothing is drawn in the headless mode and values are scaled to the
+        # terminal in the large arrays mode
+        terminal_bound = not (self._args.headless or self._args.bin)
+        # Values per terminal row
+        cell_height = SUBCELL_STEPS if self._args.subcell else 1
+        # Values must fit into the terminal without the last line
+        values_limit = (lines - 1) * cell_height
 
         self._min_element = self._args.min
         if not self._args.min > 0:
             print('Error. --min value must be greater than 0')
             return False
-        elif self._args.min >= lines:
+        elif terminal_bound and self._args.min > values_limit:
             print('Error. --min value must be less than your terminal size')
+            if self._args.subcell:
+                print(f'In the subcell mode it must not exceed '
+                      f'{values_limit}')
             print_terminal_size(columns, lines)
             return False
 
         if self._args.max is None:
             if self._args.full_screen:
-                self._max_element = lines - 1
+                self._max_element = values_limit
             else:
-                self._max_element = lines // 2
+                self._max_element = lines // 2 * cell_height
         else:
-            if self._args.max >= lines:
+            if terminal_bound and self._args.max > values_limit:
                 print('Error. --max value must be less than your terminal '
                       'size')
+                if self._args.subcell:
+                    print(f'In the subcell mode it must not exceed '
+                          f'{values_limit}')
                 print_terminal_size(columns, lines)
                 return False
             elif not self._args.max >= self._args.min:
@@ -215,7 +679,25 @@ class Program(Singleton):
                 return False
             self._max_element = self._args.max
 
-        if self._args.length is None:
+        if self._args.race:
+            # Every algorithm gets its own pane
+            panes = len(self._race_algorithms)
+            self._pane_width = (columns - 1 - (panes - 1) *
+                                len(PANE_SEPARATOR)) // panes
+            if not self._pane_width > 0:
+                print('Error. Your terminal is too narrow for so many '
+                      'algorithms')
+                print_terminal_size(columns, lines)
+                return False
+            if self._args.length is None:
+                self._array_length = self._pane_width
+            elif not 0 < self._args.length <= self._pane_width:
+                print(f'Error. --length value must be greater than 0 and '
+                      f'must not exceed the pane width {self._pane_width}')
+                return False
+            else:
+                self._array_length = self._args.length
+        elif self._args.length is None:
             if self._args.full_screen:
                 self._array_length = columns - 1
             else:
@@ -224,7 +706,7 @@ class Program(Singleton):
             if not self._args.length > 0:
                 print('Error. --length value must be greater than 0')
                 return False
-            elif self._args.length >= columns:
+            elif terminal_bound and self._args.length >= columns:
                 print('Error. --length value must be less than terminal '
                       'size')
                 print_terminal_size(columns, lines)
@@ -235,9 +717,175 @@ class Program(Singleton):
             print('Error. --delay must be at least zero')
             return False
 
+        if self._args.fps is not None and not self._args.fps > 0:
+            print('Error. --fps must be greater than 0')
+            return False
+        self._delay = self._args.delay / 1000
+        self._fps = self._args.fps
+
+        if self._args.duration is not None:
+            if self._args.race:
+                print('Error. --duration is not supported in the race mode')
+                return False
+            try:
+                self._duration = parse_duration(self._args.duration)
+            except ValueError:
+                print('Error. --duration must be a number with an optional '
+                      'unit: ' + ', '.join(DURATION_UNITS))
+                return False
+            if not self._duration > 0:
+                print('Error. --duration must be greater than 0')
+                return False
+
+        try:
+            parse_shape(self._args.shape)
+        except ValueError as exception:
+            print(f'Error. {exception}')
+            return False
+        if self._args.seed is None:
+            self._seed = random.randrange(1 << 32)
+        else:
+            self._seed = self._args.seed
+
+        if not self._args.flush_bytes > 0:
+            print('Error. --flush-bytes must be greater than 0')
+            return False
+
+        if self._args.backend == BACKEND_ANSI and (
+                self._args.no_colorama or not terminal_utils.colorama):
+            print('Error. The ansi backend needs colorama')
+            return False
+        if self._args.backend == BACKEND_CURSES:
+            try:
+                choose_access_printer_list_class(self._args.backend)
+            except ModuleNotFoundError:
+                print('Error. The curses module is not available')
+                return False
+            if self._args.cast:
+                print('Error. --cast is not supported by the curses backend')
+                return False
+            if not os.isatty(1):
+                print('Error. The curses backend needs a terminal')
+                return False
+
+        if not self._args.sweep_step > 0:
+            print('Error. --sweep-step must be greater than 0')
+            return False
+
+        if not self._args.queue_size > 0:
+            print('Error. --queue-size must be greater than 0')
+            return False
+
         # Everything is correct
         return True
 
+    def _run_headless(self):
+        """
+        Benchmarks the sorting function and prints the results as JSON
+        """
+        array = self._create_array()
+        result = {
+            'algorithm': self._args.algorithm,
+            'length': self._array_length,
+            'min': self._min_element,
+            'max': self._max_element,
+            **self._input_info,
+        }
+        result.update(run_benchmark(self._sorting_function, array))
+        print(json.dumps(result))
+
+    def _run_race(self):
+        """
+        Visualizes the race of the --algorithm algorithms
+        """
+        if self._args.no_colorama:
+            terminal_utils.colorama = None
+        if terminal_utils.colorama:
+            terminal_utils.colorama.init()
+
+        array = self._create_array()
+        lines = shutil.get_terminal_size().lines
+        sink = OutputSink(policy=self._args.flush,
+                          flush_bytes=self._args.flush_bytes)
+        race_function = run_stepping_race if self._args.stepping else run_race
+        try:
+            panes = race_function(
+                self._race_algorithms, self._args.script, array,
+                max(min(self._max_element, lines - 2), 1),
+                self._max_element, self._pane_width,
+                self._args.delay / 1000, sink, self._args.fps,
+                bool(terminal_utils.colorama)
+            )
+        except KeyboardInterrupt:
+            terminal_utils.clear_terminal()
+            print('Error. Program execution was interrupted')
+            return
+        if terminal_utils.colorama:
+            print(terminal_utils.colorama.Back.RESET +
+                  terminal_utils.colorama.Fore.RESET)
+        print()
+        for pane in sorted(panes, key=lambda pane: pane.finish_time):
+            if pane.error is not None:
+                print(f'{pane.name} failed: '
+                      f'{type(pane.error).__name__} {pane.error}')
+            else:
+                print(f'{pane.name} sorted for {pane.finish_time} sec '
+                      f'({pane.accesses} accesses)')
+        print(f'Input shape {self._args.shape}, seed {self._seed}')
+        print('Original array:', array)
+
+    def _bin_size(self) -> typing.Tuple[int, int]:
+        """
+        Returns the count of the columns and the rows of the --bin mode
+        """
+        return bin_size(self._output_size(), self._args.full_screen,
+                        self._args.subcell)
+
+    def _create_to_sort_array(self, array, sink):
+        """
+        Creates the list which visualizes accesses to the array
+        """
+        access_printer_list_class = choose_access_printer_list_class(
+            self._args.backend
+        )
+        delay = self._delay
+        if not self._args.bin:
+            return access_printer_list_class(array, delay, self._fps, sink,
+                                             subcell=self._args.subcell)
+
+        columns, rows = self._bin_size()
+        return BinnedList(
+            array, columns, rows, self._args.bin,
+            lambda heights, maximum: access_printer_list_class(
+                heights, delay, self._fps, sink, maximum, self._args.subcell
+            )
+        )
+
+    def _fit_to_duration(self, reads: int, writes: int) -> int:
+        """
+        Sets the delay and the frames per second so the visualization of
+        the accesses takes --duration
+        :return: Count of the frames the visualization is going to print
+        """
+        access_printer_list_class = choose_access_printer_list_class(
+            self._args.backend
+        )
+        if self._args.bin:
+            # Only writes are drawn and only those changing the height of
+            # their column, so this is an upper bound
+            frames = access_printer_list_class.count_frames(
+                0, writes, self._bin_size()[0], self._args.sweep_step
+            )
+        else:
+            frames = access_printer_list_class.count_frames(
+                reads, writes, self._array_length, self._args.sweep_step
+            )
+        # Every frame costs the delay on the virtual clock, the frames are
+        # merged down to the frames per second
+        self._delay = self._duration / max(frames, 1)
+        self._fps = self._args.fps or DEFAULT_DURATION_FPS
+        return frames
+
     def main(self):
         """
         Main method of the program. Read and validate arguments and if
@@ -247,33 +895,140 @@ class Program(Singleton):
         if not self._check_and_proceed_args():
             return
 
+        if self._args.headless:
+            self._run_headless()
+            return
+        if self._args.race:
+            self._run_race()
+            return
+
         if self._args.no_colorama:
             terminal_utils.colorama = None
         if terminal_utils.colorama:
             terminal_utils.colorama.init()
 
-        array = create_array(self._min_element,
-                             self._max_element,
-                             self._array_length)
+        array = self._create_array()
         array_before = array.copy()
-        to_sort_array = choose_access_printer_list_class()(
-            array, self._args.delay / 1000
-        )
+
+        trace = None
+        if self._args.record or self._args.save_trace:
+            trace, sort_time = record_trace(self._sorting_function, array)
+            array = trace.initial.copy()
+            if self._args.save_trace:
+                try:
+                    save_trace(self._args.save_trace, trace, metadata={
+                        'algorithm': self._args.algorithm,
+                        'min': self._min_element,
+                        'max': self._max_element,
+                        **self._input_info,
+                        'bin': self._args.bin,
+                        'full_screen': self._args.full_screen,
+                        'subcell': self._args.subcell,
+                    })
+                except OSError as exception:
+                    print(f'Error. Can not save the trace: {exception}')
+                    return
+        duration_frames = None
+        if self._duration is not None:
+            if trace is not None:
+                counts = {'reads': trace.reads, 'writes': trace.writes}
+            else:
+                counts = count_accesses(self._sorting_function, array)
+            duration_frames = self._fit_to_duration(counts['reads'],
+                                                    counts['writes'])
+        if self._args.cast:
+            try:
+                sink = AsciicastSink(self._args.cast, *self._cast_size,
+                                     title=self._args.algorithm,
+                                     metadata=self._input_info)
+            except OSError as exception:
+                print(f'Error. Can not create the cast file: {exception}')
+                return
+        else:
+            sink = OutputSink(policy=self._args.flush,
+                              flush_bytes=self._args.flush_bytes)
+        render_thread = None
+        if self._args.render_thread:
+            # The algorithm sorts the array, the render thread replays its
+            # accesses on a copy
+            ring = EventRing(self._args.queue_size, self._args.backpressure)
+            to_sort_array = self._create_to_sort_array(array.copy(), sink)
+            render_thread = RenderThread(ring, to_sort_array)
+        else:
+            to_sort_array = self._create_to_sort_array(array, sink)
+        profiler = None
+        if self._args.profile:
+            profiler = FrameProfiler()
+            to_sort_array.add_frame_hook(profiler)
 
         # Visualizing sort
         try:
             start_time = time.time()
-            self._sorting_function(to_sort_array)
-            to_sort_array.end_of_sort()
+            if self._args.sandbox:
+                run_sandboxed(self._args.algorithm, self._args.script,
+                              array, to_sort_array, self._args.timeout,
+                              self._memory_limit)
+            elif render_thread is not None:
+                render_thread.start()
+                try:
+                    self._sorting_function(QueuedList(array, ring))
+                except RingClosed:
+                    # The render thread failed and raises its exception
+                    render_thread.join()
+                    raise
+                sort_time = time.time() - start_time
+                ring.close()
+                render_thread.join()
+            elif trace is None:
+                self._sorting_function(to_sort_array)
+            else:
+                render_trace(trace, to_sort_array)
+            to_sort_array.end_of_sort(self._args.sweep_step)
             # Print sorting info
-            sort_time = time.time() - start_time
+            visualization_time = time.time() - start_time
             if terminal_utils.colorama:
                 print(terminal_utils.colorama.Back.RESET +
                       terminal_utils.colorama.Fore.RESET)
             print()
-            print('Sorted and visualized for', sort_time, 'sec')
-            print('Original array:', array_before)
-            print('Sorted array:', array)
+            if render_thread is not None:
+                print('Sorted for', sort_time, 'sec')
+                print('Visualized for', visualization_time, 'sec')
+                print(f'Render queue: {render_thread.rendered} events '
+                      f'rendered, maximal depth {ring.max_depth}, '
+                      f'{ring.dropped} dropped, {ring.coalesced} coalesced, '
+                      f'render lag {render_thread.mean_lag:.6f} sec on '
+                      f'average and {render_thread.max_lag:.6f} sec maximum')
+            elif trace is None:
+                print('Sorted and visualized for', visualization_time, 'sec')
+            else:
+                print('Sorted for', sort_time, 'sec')
+                print('Visualized for', visualization_time, 'sec')
+                print(f'Recorded {len(trace)} accesses '
+                      f'({trace.reads} reads, {trace.writes} writes)')
+            if self._args.cast:
+                sink.close()
+                print(f'Exported {sink.frames} frames ({sink.bytes_written} '
+                      f'bytes, {sink.time():.2f} sec) to {self._args.cast}')
+            else:
+                print(f'Written {sink.bytes_written} bytes in '
+                      f'{sink.syscalls} write calls')
+            if duration_frames is not None:
+                stride = max(duration_frames / (self._duration * self._fps),
+                             1)
+                print(f'Duration budget: {duration_frames} frames in '
+                      f'{self._duration} sec, delay {self._delay * 1000:.4f} '
+                      f'ms, about {stride:.1f} frames merged into every '
+                      f'printed one')
+            if profiler is not None:
+                print(profiler.report())
+            print(f'Input shape {self._args.shape}, seed {self._seed}')
+            # Binned arrays are too large to be printed
+            if not self._args.bin:
+                print('Original array:', array_before)
+                print('Sorted array:', array)
         except KeyboardInterrupt:
             terminal_utils.clear_terminal()
             print('Error. Program execution was interrupted')
+        except SandboxError as exception:
+            terminal_utils.clear_terminal()
+            print(f'Error. {exception}')
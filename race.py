@@ -0,0 +1,308 @@
+import array
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+import typing
+
+from access_printer_list import (ACCESS_ELEMENT_CHAR, BACKGROUND_CHAR,
+                                 ELEMENT_CHAR, SORTED_ELEMENT_CHAR,
+                                 slice_assignment)
+from access_trace import OP_READ, OP_WRITE
+from framebuffer import ColumnFramebuffer
+from sorting_algorithms import load_sorting_function
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FPS = 30
+
+PANE_SEPARATOR = ' '
+
+_ELEMENT_CELL = 1
+_ACCESS_CELL = 2
+_SORTED_CELL = 3
+
+
+class EventStreamList:
+    """
+    List proxy of a race worker. Accesses are collected into batches of
+    (op, index, value) arrays which are sent to the compositor; every access
+    costs the delay on the virtual clock of the worker
+    """
+
+    def __init__(self, lst, connection, batch_size, delay):
+        self._list = lst
+        self.__connection = connection
+        self.__batch_size = batch_size
+        self.__delay = delay
+        self.__accesses = 0
+        self.__start_time = time.perf_counter()
+        self.__new_batch()
+
+    def __new_batch(self):
+        self.__ops = array.array('B')
+        self.__indices = array.array('Q')
+        self.__values = array.array('q')
+
+    def __append(self, op, index, value):
+        self.__ops.append(op)
+        self.__indices.append(index)
+        self.__values.append(value)
+        if len(self.__ops) >= self.__batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.__ops:
+            return
+        self.__connection.send((self.__ops.tobytes(),
+                                self.__indices.tobytes(),
+                                self.__values.tobytes()))
+        self.__accesses += len(self.__ops)
+        self.__new_batch()
+        lag = (self.__accesses * self.__delay -
+               (time.perf_counter() - self.__start_time))
+        if lag > 0:
+            time.sleep(lag)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[index]
+                    for index in range(*item.indices(len(self._list)))]
+        value = self._list[item]
+        self.__append(OP_READ, item % len(self._list), value)
+        return value
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            for index, item in zip(*slice_assignment(key, len(self._list),
+                                                     value)):
+                self[index] = item
+            return
+        self.__append(OP_WRITE, key % len(self._list), value)
+        self._list[key] = value
+
+    def __len__(self):
+        return len(self._list)
+
+
+def _race_worker(algorithm, script, lst, connection, batch_size, delay):
+    """
+    Sorts the list in a worker process streaming the accesses to the
+    connection. None marks the end of the stream, an exception is sent
+    instead if the sorting fails
+    """
+    try:
+        sorting_function = load_sorting_function(algorithm, script)
+        stream_list = EventStreamList(lst, connection, batch_size, delay)
+        sorting_function(stream_list)
+        stream_list.flush()
+        connection.send(None)
+    except Exception as exception:
+        connection.send(exception)
+    finally:
+        connection.close()
+
+
+class _Pane:
+    def __init__(self, name, lst, width, rows, maximum, encoding):
+        self.name = name
+        self.list = list(lst)
+        self.framebuffer = ColumnFramebuffer(
+            width, rows,
+            (BACKGROUND_CHAR, ELEMENT_CHAR, ACCESS_ELEMENT_CHAR,
+             SORTED_ELEMENT_CHAR),
+            encoding
+        )
+        self.rows = rows
+        self.maximum = maximum
+        self.accessed = set()
+        self.dirty = True
+        self.finish_time = None
+        self.accesses = 0
+        self.error = None
+        self.framebuffer.set_columns(
+            0, [self.height(value) for value in self.list], _ELEMENT_CELL
+        )
+
+    def height(self, value) -> int:
+        return -(-value * self.rows // self.maximum)
+
+    def apply(self, ops, indices, values):
+        for op, index, value in zip(ops, indices, values):
+            if op == OP_WRITE:
+                self.list[index] = value
+            self.accessed.add(index)
+        self.accesses += len(ops)
+        self.dirty = True
+
+    def title(self, place=None) -> str:
+        title = self.name
+        if self.error is not None:
+            title += ' failed'
+        elif self.finish_time is not None:
+            title += f' #{place} {self.finish_time:.2f}s'
+        return title[:self.framebuffer.width].ljust(self.framebuffer.width)
+
+    def update_framebuffer(self):
+        """
+        Paints the columns accessed since the last frame with the access
+        glyph and the previously accessed ones back
+        """
+        for index in self.accessed:
+            self.framebuffer.set_column(index, self.height(self.list[index]),
+                                        _ACCESS_CELL)
+
+    def restore_accessed(self):
+        for index in self.accessed:
+            self.framebuffer.set_column(index, self.height(self.list[index]),
+                                        _ELEMENT_CELL)
+        self.accessed.clear()
+
+    def paint_sorted(self):
+        self.framebuffer.set_columns(
+            0, [self.height(value) for value in self.list], _SORTED_CELL
+        )
+        self.dirty = True
+
+
+class RaceCompositor:
+    """
+    Draws the panes of the racing algorithms side by side. With ANSI escape
+    sequences only the dirty panes are redrawn, otherwise the whole screen is
+    printed
+    """
+
+    def __init__(self, names, lst, pane_width, rows, maximum, sink,
+                 ansi=True):
+        encoding = sys.stdout.encoding or 'utf-8'
+        self.panes = [_Pane(name, lst, pane_width, rows, maximum, encoding)
+                      for name in names]
+        self.__sink = sink
+        self.__ansi = ansi
+        self.__pane_width = pane_width
+        self.__rows = rows
+        # The plain frames are scrolled up to the top of the terminal
+        self.__padding = b'\n' * max(
+            sink.terminal_size().lines - rows - 1, 0
+        )
+
+    def __places(self):
+        finished = sorted((pane for pane in self.panes
+                           if pane.finish_time is not None),
+                          key=lambda pane: pane.finish_time)
+        return {id(pane): place for place, pane in enumerate(finished, 1)}
+
+    def first_print(self):
+        self.__sink.clear()
+        for pane in self.panes:
+            pane.dirty = True
+        self.draw(full=True)
+
+    def draw(self, full=False):
+        """
+        Prints the dirty panes
+        """
+        dirty = [pane for pane in self.panes if pane.dirty]
+        if not dirty:
+            return
+        for pane in dirty:
+            pane.update_framebuffer()
+        places = self.__places()
+        if self.__ansi and not full:
+            to_print = b''
+            for pane_index, pane in enumerate(self.panes):
+                if not pane.dirty:
+                    continue
+                column = pane_index * (self.__pane_width +
+                                       len(PANE_SEPARATOR)) + 1
+                to_print += (f'\033[1;{column}H' +
+                             pane.title(places.get(id(pane)))).encode()
+                for row, row_bytes in enumerate(
+                        pane.framebuffer.render_rows()):
+                    to_print += f'\033[{row + 2};{column}H'.encode()
+                    to_print += row_bytes
+            to_print += f'\033[{self.__rows + 2};1H'.encode()
+        else:
+            if self.__ansi:
+                to_print = b'\033[H'
+            else:
+                to_print = b''
+            separator = PANE_SEPARATOR.encode()
+            to_print += separator.join(
+                pane.title(places.get(id(pane))).encode()
+                for pane in self.panes
+            ) + b'\n'
+            rows = zip(*(pane.framebuffer.render_rows()
+                         for pane in self.panes))
+            to_print += b''.join(separator.join(row) + b'\n' for row in rows)
+            if not self.__ansi:
+                to_print += self.__padding
+        self.__sink.write(to_print)
+        self.__sink.end_frame()
+        for pane in dirty:
+            pane.restore_accessed()
+            pane.dirty = False
+
+
+def run_race(algorithms: typing.List[str], script, lst, rows, maximum,
+             pane_width, delay, sink, fps=None, ansi=True,
+             batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Sorts copies of the list with every algorithm in a separate worker
+    process and draws the progress of all of them in one screen
+    :return: List of the panes with their finish times, in the order of
+    the algorithms
+    """
+    frame_interval = 1 / (fps or DEFAULT_FPS)
+    compositor = RaceCompositor(algorithms, lst, pane_width, rows, maximum,
+                                sink, ansi)
+    compositor.first_print()
+    connections = {}
+    processes = []
+    start_time = time.perf_counter()
+    for pane in compositor.panes:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_race_worker,
+            args=(pane.name, script, list(lst), sender, batch_size, delay),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+        connections[receiver] = pane
+        processes.append(process)
+
+    next_frame_time = start_time
+    try:
+        while connections:
+            timeout = max(next_frame_time - time.perf_counter(), 0)
+            for connection in multiprocessing.connection.wait(
+                    list(connections), timeout):
+                pane = connections[connection]
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    message = EOFError('Worker exited unexpectedly')
+                if isinstance(message, tuple):
+                    ops, indices, values = message
+                    pane.apply(array.array('B', ops),
+                               array.array('Q', indices),
+                               array.array('q', values))
+                    continue
+                pane.finish_time = time.perf_counter() - start_time
+                if message is not None:
+                    pane.error = message
+                else:
+                    pane.restore_accessed()
+                    pane.paint_sorted()
+                del connections[connection]
+            if time.perf_counter() >= next_frame_time:
+                compositor.draw()
+                next_frame_time = time.perf_counter() + frame_interval
+        compositor.draw()
+        sink.flush()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    return compositor.panes
@@ -0,0 +1,214 @@
+import array
+import threading
+import time
+import typing
+
+from access_printer_list import slice_assignment
+from access_trace import OP_READ, OP_WRITE
+
+BACKPRESSURE_BLOCK = 'block'
+BACKPRESSURE_DROP = 'drop'
+BACKPRESSURE_COALESCE = 'coalesce'
+BACKPRESSURE_POLICIES = (BACKPRESSURE_BLOCK, BACKPRESSURE_DROP,
+                         BACKPRESSURE_COALESCE)
+
+DEFAULT_QUEUE_SIZE = 4096
+
+
+class RingClosed(Exception):
+    """
+    Raised to the producer when the ring was closed, e.g. since the
+    consumer failed
+    """
+
+
+class EventRing:
+    """
+    Bounded ring buffer of access events preallocated in typed arrays.
+    When the ring is full the producer, depending on the backpressure policy:
+    'block' - waits for the consumer,
+    'drop' - drops reads, which only highlight elements, and waits on writes,
+    'coalesce' - drops reads and merges writes into an overflow dictionary
+    (the latest write of an index wins) which the consumer takes after the
+    ring
+    """
+
+    def __init__(self, capacity=DEFAULT_QUEUE_SIZE,
+                 backpressure=BACKPRESSURE_BLOCK):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'Unknown backpressure policy {backpressure}')
+        self.capacity = capacity
+        self.__backpressure = backpressure
+        self.__ops = array.array('B', bytes(capacity))
+        self.__indices = array.array('Q', bytes(8 * capacity))
+        self.__values = array.array('q', bytes(8 * capacity))
+        self.__times = array.array('d', bytes(8 * capacity))
+        # Counts of pushed and popped events, positions are taken modulo
+        # the capacity
+        self.__head = 0
+        self.__tail = 0
+        self.__overflow = {}
+        self.__closed = False
+        self.__condition = threading.Condition()
+        self.max_depth = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def depth(self) -> int:
+        return self.__head - self.__tail + len(self.__overflow)
+
+    def push(self, op: int, index: int, value: int):
+        """
+        :raise RingClosed: If the ring is closed
+        """
+        with self.__condition:
+            if self.__closed:
+                raise RingClosed
+            if self.__overflow or self.__head - self.__tail >= self.capacity:
+                if self.__backpressure != BACKPRESSURE_BLOCK and op == OP_READ:
+                    self.dropped += 1
+                    return
+                if self.__backpressure == BACKPRESSURE_COALESCE:
+                    if index in self.__overflow:
+                        self.coalesced += 1
+                    self.__overflow[index] = value
+                    self.__condition.notify()
+                    return
+                while self.__head - self.__tail >= self.capacity:
+                    self.__condition.wait()
+                    if self.__closed:
+                        raise RingClosed
+            position = self.__head % self.capacity
+            self.__ops[position] = op
+            self.__indices[position] = index
+            self.__values[position] = value
+            self.__times[position] = time.perf_counter()
+            self.__head += 1
+            depth = self.__head - self.__tail
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.__condition.notify()
+
+    def close(self):
+        """
+        Tells the consumer that no more events will be pushed and wakes the
+        producer waiting for the consumer
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def pop_batch(
+            self
+    ) -> typing.Optional[typing.List[typing.Tuple[int, int, int, float]]]:
+        """
+        Waits for events and takes all of them
+        :return: List of (op, index, value, push time) tuples or None if the
+        ring is closed and empty
+        """
+        with self.__condition:
+            while self.__head == self.__tail and not self.__overflow:
+                if self.__closed:
+                    return None
+                self.__condition.wait()
+            batch = []
+            for position in range(self.__tail, self.__head):
+                position %= self.capacity
+                batch.append((self.__ops[position],
+                              self.__indices[position],
+                              self.__values[position],
+                              self.__times[position]))
+            self.__tail = self.__head
+            if self.__overflow:
+                now = time.perf_counter()
+                batch.extend((OP_WRITE, index, value, now)
+                             for index, value in self.__overflow.items())
+                self.__overflow = {}
+            self.__condition.notify_all()
+            return batch
+
+
+class QueuedList:
+    """
+    List proxy which pushes every access into the event ring instead of
+    visualizing it
+    """
+
+    def __init__(self, lst, ring: EventRing):
+        self._list = lst
+        self.__push = ring.push
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[index]
+                    for index in range(*item.indices(len(self._list)))]
+        value = self._list[item]
+        self.__push(OP_READ, item % len(self._list), value)
+        return value
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            for index, item in zip(*slice_assignment(key, len(self._list),
+                                                     value)):
+                self[index] = item
+            return
+        self.__push(OP_WRITE, key % len(self._list), value)
+        self._list[key] = value
+
+    def __len__(self):
+        return len(self._list)
+
+
+class RenderThread(threading.Thread):
+    """
+    Thread which drains the event ring into the access printer list. If the
+    rendering fails, the ring is closed, so the producer stops with
+    RingClosed, and the exception is raised again by join
+    """
+
+    def __init__(self, ring: EventRing, access_printer_list):
+        super().__init__(daemon=True)
+        self.__ring = ring
+        self.__access_printer_list = access_printer_list
+        self.rendered = 0
+        self.max_lag = 0
+        self.__total_lag = 0
+        self.__error = None
+
+    @property
+    def mean_lag(self) -> float:
+        return self.__total_lag / self.rendered if self.rendered else 0
+
+    def run(self):
+        try:
+            self.__render()
+        except BaseException as exception:
+            self.__error = exception
+            self.__ring.close()
+
+    def join(self, timeout=None):
+        """
+        :raise Exception: The exception the rendering failed with, if it
+        failed
+        """
+        super().join(timeout)
+        if self.__error is not None:
+            raise self.__error
+
+    def __render(self):
+        access_printer_list = self.__access_printer_list
+        while True:
+            batch = self.__ring.pop_batch()
+            if batch is None:
+                return
+            for op, index, value, push_time in batch:
+                if op == OP_READ:
+                    access_printer_list[index]
+                else:
+                    access_printer_list[index] = value
+                lag = time.perf_counter() - push_time
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                self.__total_lag += lag
+                self.rendered += 1
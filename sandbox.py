@@ -0,0 +1,168 @@
+import array
+import multiprocessing
+import signal
+import time
+import typing
+from multiprocessing import shared_memory
+
+from access_trace import OP_READ
+from race import DEFAULT_BATCH_SIZE, EventStreamList
+from sorting_algorithms import load_sorting_function
+
+try:
+    import resource
+except ModuleNotFoundError:
+    resource = None
+
+VALUE_TYPECODE = 'q'
+
+# The CPU time limit needs the profiling timer and the signal masks, which
+# aren't available on Windows
+CPU_TIME_LIMIT_AVAILABLE = all(
+    hasattr(signal, name)
+    for name in ('setitimer', 'SIGPROF', 'pthread_sigmask')
+)
+
+
+class SandboxError(Exception):
+    pass
+
+
+class SandboxTimeout(Exception):
+    pass
+
+
+def _raise_sandbox_timeout(signum, frame):
+    raise SandboxTimeout
+
+
+class _SandboxList(EventStreamList):
+    """
+    Event stream over the shared memory array. The time limit signal is
+    blocked while a batch is sent, so it can't cut a message in half
+    """
+
+    def flush(self):
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGPROF})
+        try:
+            super().flush()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGPROF})
+
+
+def _sandbox_worker(algorithm, script, memory_name, length, connection,
+                    batch_size, timeout, memory_limit):
+    """
+    Sorts the shared memory array in the child process streaming the
+    accesses to the connection. None marks the end of the stream, an
+    exception is sent instead if the sorting fails
+    """
+    memory = shared_memory.SharedMemory(memory_name)
+    values = memory.buf[:length * array.array(VALUE_TYPECODE).itemsize]
+    values = values.cast(VALUE_TYPECODE)
+    # The parent limits the wall time, the CPU time is limited here as well
+    # where the profiling timer is available
+    cpu_timeout = timeout if CPU_TIME_LIMIT_AVAILABLE else None
+    try:
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS,
+                               (memory_limit, memory_limit))
+        if cpu_timeout:
+            signal.signal(signal.SIGPROF, _raise_sandbox_timeout)
+            signal.setitimer(signal.ITIMER_PROF, timeout)
+        sorting_function = load_sorting_function(algorithm, script)
+        # The signal is blocked only if the time limit can send it
+        list_class = _SandboxList if cpu_timeout else EventStreamList
+        sandbox_list = list_class(values, connection, batch_size, 0)
+        sorting_function(sandbox_list)
+        if cpu_timeout:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        sandbox_list.flush()
+        connection.send(None)
+    except Exception as exception:
+        if cpu_timeout:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        connection.send(exception)
+    finally:
+        connection.close()
+        values.release()
+        memory.close()
+
+
+def run_sandboxed(algorithm: str, script: typing.Optional[str], lst,
+                  access_printer_list, timeout=None, memory_limit=None,
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Sorts a copy of the list in a child process which works on a shared
+    memory array and replays its accesses on the access printer list, so a
+    slow or crashing algorithm can't block or kill the renderer
+    :param timeout: Limit of the wall time of the sorting in seconds; the
+    child process is terminated once it's exceeded. The CPU time is limited
+    as well if CPU_TIME_LIMIT_AVAILABLE
+    :param memory_limit: Limit of the address space of the child process
+    in bytes
+    :raise SandboxError: If the sorting fails, exceeds a limit or the child
+    process dies
+    """
+    itemsize = array.array(VALUE_TYPECODE).itemsize
+    memory = shared_memory.SharedMemory(create=True,
+                                        size=max(len(lst), 1) * itemsize)
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = None
+    try:
+        values = memory.buf[:len(lst) * itemsize].cast(VALUE_TYPECODE)
+        values[:] = array.array(VALUE_TYPECODE, lst)
+        values.release()
+        process = multiprocessing.Process(
+            target=_sandbox_worker,
+            args=(algorithm, script, memory.name, len(lst), sender,
+                  batch_size, timeout, memory_limit),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            # A sorting which keeps sending accesses is stopped as well
+            if deadline is not None and not (
+                    time.monotonic() < deadline and
+                    receiver.poll(deadline - time.monotonic())):
+                raise SandboxError(f'The sorting exceeded the limit of '
+                                   f'{timeout} sec')
+            try:
+                message = receiver.recv()
+            except EOFError:
+                process.join()
+                raise SandboxError(f'The sorting process exited '
+                                   f'unexpectedly with code '
+                                   f'{process.exitcode}')
+            if isinstance(message, tuple):
+                ops, indices, values = message
+                for op, index, value in zip(array.array('B', ops),
+                                            array.array('Q', indices),
+                                            array.array('q', values)):
+                    if op == OP_READ:
+                        access_printer_list[index]
+                    else:
+                        access_printer_list[index] = value
+            elif message is None:
+                return
+            elif isinstance(message, SandboxTimeout):
+                raise SandboxError(f'The sorting exceeded the limit of '
+                                   f'{timeout} sec of CPU time')
+            elif isinstance(message, MemoryError):
+                raise SandboxError(f'The sorting exceeded the limit of '
+                                   f'{memory_limit} bytes of memory')
+            else:
+                raise SandboxError(f'{type(message).__name__} exception '
+                                   f'occurred during the sorting. '
+                                   f'Additional info: {message}')
+    finally:
+        if process is not None:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        sender.close()
+        receiver.close()
+        memory.close()
+        memory.unlink()
@@ -1,3 +1,7 @@
+import runpy
+import typing
+
+
 # Quick sort
 def quick_sort(array, left=0, right=-1):
     if right < 0:
@@ -23,8 +27,297 @@ def _partition(array, left, right):
     return right
 
 
+# Introsort
+# Partitions of this size or smaller are sorted with the insertion sort
+INTROSORT_INSERTION_THRESHOLD = 16
+# Partitions larger than this take the ninther as the pivot
+NINTHER_THRESHOLD = 128
+
+
+def _median_of_three(array, a, b, c):
+    """
+    Returns the index of the median of the values at the indices
+    """
+    a_value = array[a]
+    b_value = array[b]
+    c_value = array[c]
+    if a_value < b_value:
+        if b_value < c_value:
+            return b
+        return c if a_value < c_value else a
+    if a_value < c_value:
+        return a
+    return c if b_value < c_value else b
+
+
+def choose_pivot(array, left, right):
+    """
+    Moves the median of three or, for large partitions, the ninther
+    (median of three medians of three) to the middle of [left, right], where
+    _partition takes its pivot
+    """
+    mid = (left + right) // 2
+    if right - left + 1 > NINTHER_THRESHOLD:
+        step = (right - left) // 8
+        pivot = _median_of_three(
+            array,
+            _median_of_three(array, left, left + step, left + 2 * step),
+            _median_of_three(array, mid - step, mid, mid + step),
+            _median_of_three(array, right - 2 * step, right - step, right)
+        )
+    else:
+        pivot = _median_of_three(array, left, mid, right)
+    if pivot != mid:
+        array[pivot], array[mid] = array[mid], array[pivot]
+
+
+def _heap_sort(array, left, right):
+    """
+    Sorts [left, right] of the array with the heapsort
+    """
+    size = right - left + 1
+    for root in range(size // 2 - 1, -1, -1):
+        _sift_down(array, left, root, size)
+    for end in range(size - 1, 0, -1):
+        array[left], array[left + end] = array[left + end], array[left]
+        _sift_down(array, left, 0, end)
+
+
+def _sift_down(array, start, root, size):
+    """
+    Sifts the root down the max-heap of the size stored from the start
+    """
+    value = array[start + root]
+    while True:
+        child = 2 * root + 1
+        if child >= size:
+            break
+        child_value = array[start + child]
+        if child + 1 < size:
+            right_value = array[start + child + 1]
+            if right_value > child_value:
+                child += 1
+                child_value = right_value
+        if child_value <= value:
+            break
+        array[start + root] = child_value
+        root = child
+    array[start + root] = value
+
+
+def introsort(array):
+    """
+    Quick sort with an explicit stack: partitions are sorted with the
+    heapsort once they get too deep and with the insertion sort once they
+    get small
+    """
+    length = len(array)
+    if length < 2:
+        return
+    # Stack of the (left, right, depth limit) partitions; the larger part
+    # is pushed, so the stack holds O(log n) partitions
+    stack = [(0, length - 1, 2 * length.bit_length())]
+    while stack:
+        left, right, depth_limit = stack.pop()
+        while right - left + 1 > INTROSORT_INSERTION_THRESHOLD:
+            if not depth_limit:
+                _heap_sort(array, left, right)
+                break
+            depth_limit -= 1
+            choose_pivot(array, left, right)
+            support = _partition(array, left, right)
+            if support - left < right - support:
+                stack.append((support + 1, right, depth_limit))
+                right = support
+            else:
+                stack.append((left, support, depth_limit))
+                left = support + 1
+        else:
+            _insertion_sort(array, left, right + 1, left + 1)
+
+
+def make_aux_buffer(array, length: int):
+    """
+    Returns an auxiliary buffer of the length for the sorting of the array.
+    The array may provide the buffer with its make_aux_buffer method, e.g.
+    to visualize or count the accesses to the buffer; otherwise it's a plain
+    list
+    """
+    make = getattr(array, 'make_aux_buffer', None)
+    if make is None:
+        return [None] * length
+    return make(length)
+
+
 # Merge sort
-def _merge(arr, left, mid, end):
+def _merge(array, buffer, left, mid, right):
+    """
+    Merges the sorted [left, mid) and [mid, right) parts of the array. The
+    left part is moved to the same positions of the buffer first
+    """
+    if array[mid - 1] <= array[mid]:
+        return
+    buffer[left:mid] = array[left:mid]
+    i = left
+    j = mid
+    left_value = buffer[i]
+    right_value = array[j]
+    for k in range(left, right):
+        if left_value <= right_value:
+            array[k] = left_value
+            i += 1
+            if i == mid:
+                # The rest of the right part is already in place
+                return
+            left_value = buffer[i]
+        else:
+            array[k] = right_value
+            j += 1
+            if j == right:
+                array[k + 1:right] = buffer[i:mid]
+                return
+            right_value = array[j]
+
+
+def _merge_sort(array, buffer, left, right):
+    if right - left > 1:
+        mid = (left + right) // 2
+        _merge_sort(array, buffer, left, mid)
+        _merge_sort(array, buffer, mid, right)
+        _merge(array, buffer, left, mid, right)
+
+
+def merge_sort(array):
+    _merge_sort(array, make_aux_buffer(array, len(array)), 0, len(array))
+
+
+def iterative_merge_sort(array):
+    """
+    Same as merge_sort, but with an explicit stack instead of the recursion
+    """
+    length = len(array)
+    buffer = make_aux_buffer(array, length)
+    # Stack of the (left, right, merging) ranges: a range is split first and
+    # merged after both of its halves are sorted
+    stack = [(0, length, False)]
+    while stack:
+        left, right, merging = stack.pop()
+        mid = (left + right) // 2
+        if merging:
+            _merge(array, buffer, left, mid, right)
+        elif right - left > 1:
+            stack.append((left, right, True))
+            stack.append((mid, right, False))
+            stack.append((left, mid, False))
+
+
+# Bottom-up merge sort
+def bottom_up_merge_sort(array):
+    length = len(array)
+    buffer = make_aux_buffer(array, length)
+    width = 1
+    while width < length:
+        for left in range(0, length - width, 2 * width):
+            _merge(array, buffer, left, left + width,
+                   min(left + 2 * width, length))
+        width *= 2
+
+
+# Natural merge sort
+# Shorter runs are extended with the insertion sort
+NATURAL_MIN_RUN = 8
+
+
+def _find_run(array, start, length):
+    """
+    Returns the end of the non-descending or strictly descending run which
+    starts at start. A descending run is reversed
+    """
+    stop = start + 1
+    if stop == length:
+        return stop
+    previous = array[stop]
+    descending = previous < array[start]
+    stop += 1
+    while stop < length:
+        value = array[stop]
+        if (value < previous) != descending:
+            break
+        previous = value
+        stop += 1
+    if descending:
+        array[start:stop] = array[start:stop][::-1]
+    return stop
+
+
+def _insertion_sort(array, start, stop, sorted_stop):
+    """
+    Sorts [start, stop) of the array which is sorted up to the sorted_stop
+    """
+    for i in range(sorted_stop, stop):
+        value = array[i]
+        j = i
+        while j > start:
+            previous = array[j - 1]
+            if previous <= value:
+                break
+            array[j] = previous
+            j -= 1
+        if j != i:
+            array[j] = value
+
+
+def _merge_runs(array, buffer, runs, n):
+    """
+    Merges the n-th run of the stack with the next one
+    """
+    start, mid = runs[n]
+    stop = runs[n + 1][1]
+    _merge(array, buffer, start, mid, stop)
+    runs[n] = (start, stop)
+    del runs[n + 1]
+
+
+def _collapse_runs(array, buffer, runs):
+    """
+    Merges the runs on the top of the stack until their lengths satisfy
+    the Timsort invariants, so the merges stay balanced
+    """
+    def size(i):
+        return runs[i][1] - runs[i][0]
+
+    while len(runs) > 1:
+        n = len(runs) - 2
+        if ((n > 0 and size(n - 1) <= size(n) + size(n + 1)) or
+                (n > 1 and size(n - 2) <= size(n - 1) + size(n))):
+            if size(n - 1) < size(n + 1):
+                n -= 1
+        elif size(n) > size(n + 1):
+            break
+        _merge_runs(array, buffer, runs, n)
+
+
+def natural_merge_sort(array):
+    length = len(array)
+    buffer = make_aux_buffer(array, length)
+    # Stack of the (start, stop) runs which are not merged yet
+    runs = []
+    start = 0
+    while start < length:
+        stop = _find_run(array, start, length)
+        if stop - start < NATURAL_MIN_RUN:
+            forced_stop = min(start + NATURAL_MIN_RUN, length)
+            _insertion_sort(array, start, forced_stop, stop)
+            stop = forced_stop
+        runs.append((start, stop))
+        _collapse_runs(array, buffer, runs)
+        start = stop
+    while len(runs) > 1:
+        _merge_runs(array, buffer, runs, len(runs) - 2)
+
+
+# In-place merge sort
+def _merge_in_place(arr, left, mid, end):
     right = mid + 1
 
     # If the direct merge is already sorted
@@ -56,7 +349,7 @@ def _merge(arr, left, mid, end):
             right += 1
 
 
-def merge_sort(arr, left=0, right=None):
+def in_place_merge_sort(arr, left=0, right=None):
     if right is None:
         right = len(arr) - 1
     if left < right:
@@ -65,10 +358,10 @@ def merge_sort(arr, left=0, right=None):
         m = left + (right - left) // 2
 
         # Sort first and second halves
-        merge_sort(arr, left, m)
-        merge_sort(arr, m + 1, right)
+        in_place_merge_sort(arr, left, m)
+        in_place_merge_sort(arr, m + 1, right)
 
-        _merge(arr, left, m, right)
+        _merge_in_place(arr, left, m, right)
 
 
 # Bubble sort
@@ -138,8 +431,48 @@ def radix_sort(array):
 
 SORTING_ALGORITHMS = {
     'quicksort': quick_sort,
+    'introsort': introsort,
     'bubble_sort': bubble_sort,
     'merge_sort': merge_sort,
+    'iterative_merge_sort': iterative_merge_sort,
+    'bottom_up_merge_sort': bottom_up_merge_sort,
+    'natural_merge_sort': natural_merge_sort,
+    'in_place_merge_sort': in_place_merge_sort,
     'cocktail_shaker_sort': cocktail_shaker_sort,
     'radix_sort': radix_sort
 }
+
+
+def load_sorting_functions(algorithms: typing.Iterable[str],
+                           script: typing.Optional[str] = None) -> list:
+    """
+    Returns the builtin sorting algorithms or the functions from the
+    external script, which is run at most once
+    :raises ValueError: If there is no such algorithm
+    """
+    sorting_functions = []
+    namespace = None
+    for algorithm in algorithms:
+        if algorithm in SORTING_ALGORITHMS:
+            sorting_functions.append(SORTING_ALGORITHMS[algorithm])
+            continue
+        if not script:
+            raise ValueError(f'{algorithm} is not a builtin algorithm and no '
+                             f'script is specified')
+        if namespace is None:
+            namespace = runpy.run_path(script)
+        sorting_function = namespace.get(algorithm)
+        if not sorting_function:
+            raise ValueError(f'There is no {algorithm} function in the '
+                             f'{script}')
+        sorting_functions.append(sorting_function)
+    return sorting_functions
+
+
+def load_sorting_function(algorithm: str, script: typing.Optional[str] = None):
+    """
+    Returns the builtin sorting algorithm or the function from the external
+    script
+    :raises ValueError: If there is no such algorithm
+    """
+    return load_sorting_functions((algorithm,), script)[0]
@@ -0,0 +1,288 @@
+import asyncio
+import functools
+import inspect
+import time
+import typing
+
+from access_trace import OP_READ, OP_WRITE, AccessTrace, record_trace
+from race import DEFAULT_FPS, RaceCompositor
+from sorting_algorithms import load_sorting_function
+
+# Comparison of two items; the event is (OP_COMPARE, index, other index)
+OP_COMPARE = 2
+
+# Events a task which isn't rate limited handles before it lets the other
+# tasks run
+DEFAULT_BATCH_SIZE = 256
+
+TASK_WAITING = 'waiting'
+TASK_RUNNING = 'running'
+TASK_PAUSED = 'paused'
+TASK_FINISHED = 'finished'
+TASK_FAILED = 'failed'
+TASK_CANCELLED = 'cancelled'
+
+Event = typing.Tuple[int, int, int]
+Steps = typing.Iterator[Event]
+
+
+def _failed_steps(exception: Exception) -> Steps:
+    raise exception
+    yield
+
+
+def _replay_steps(trace: AccessTrace, lst) -> Steps:
+    for event in trace:
+        if event[0] == OP_WRITE:
+            lst[event[1]] = event[2]
+        yield event
+
+
+def function_steps(sorting_function) -> typing.Callable[[list], Steps]:
+    """
+    Adapts the plain sorting function to the stepping protocol: the function
+    sorts a copy of the list at once when the steps are created, before the
+    scheduler runs, and the steps replay the recorded accesses on the list.
+    An error of the function is raised by the first step
+    """
+    @functools.wraps(sorting_function)
+    def steps(lst) -> Steps:
+        try:
+            trace, _ = record_trace(sorting_function, list(lst))
+        except Exception as exception:
+            return _failed_steps(exception)
+        return _replay_steps(trace, lst)
+    return steps
+
+
+# Bubble sort
+def bubble_sort_steps(lst) -> Steps:
+    length = len(lst)
+    for i in range(length - 1):
+        for j in range(length - i - 1):
+            yield OP_COMPARE, j, j + 1
+            if lst[j] > lst[j + 1]:
+                lst[j], lst[j + 1] = lst[j + 1], lst[j]
+                yield OP_WRITE, j, lst[j]
+                yield OP_WRITE, j + 1, lst[j + 1]
+
+
+STEPPING_ALGORITHMS = {
+    'bubble_sort': bubble_sort_steps,
+}
+
+
+def load_stepping_function(algorithm: str,
+                           script: typing.Optional[str] = None):
+    """
+    Returns the stepping function of the algorithm: a function which takes
+    the list and returns the steps sorting it in-place. Generator functions
+    of the script are used as they are, other sorting functions are adapted
+    :raises ValueError: If there is no such algorithm
+    """
+    if algorithm in STEPPING_ALGORITHMS:
+        return STEPPING_ALGORITHMS[algorithm]
+    sorting_function = load_sorting_function(algorithm, script)
+    if inspect.isgeneratorfunction(sorting_function):
+        return sorting_function
+    return function_steps(sorting_function)
+
+
+class SortTask:
+    """
+    Stepping sort run by the StepScheduler. Every event of the steps is
+    passed to the callback. The task may be rate limited, paused, advanced
+    by a few steps while paused and cancelled
+    """
+
+    def __init__(self, name: str, steps: Steps,
+                 callback: typing.Callable[[Event], None], rate=None,
+                 on_done: typing.Callable[['SortTask'], None] = None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param rate: Maximal count of the events per second, unlimited if
+        not set
+        :param on_done: Called with the task when it finishes, fails or is
+        cancelled
+        """
+        self.name = name
+        self.rate = rate
+        self.events = 0
+        self.error = None
+        self.status = TASK_WAITING
+        self.__steps = steps
+        self.__callback = callback
+        self.__on_done = on_done
+        self.__batch_size = batch_size
+        self.__paused = False
+        # Events the paused task may still handle
+        self.__step_budget = 0
+        self.__wakeup = asyncio.Event()
+        # Time the rate limit counts the events from
+        self.__origin = 0
+        self.__task = None
+
+    def pause(self):
+        self.__paused = True
+
+    def resume(self):
+        self.__paused = False
+        self.__step_budget = 0
+        self.__wakeup.set()
+
+    def step(self, count=1):
+        """
+        Lets the paused task handle count more events
+        """
+        self.__step_budget += count
+        self.__wakeup.set()
+
+    def cancel(self):
+        if self.__task is not None:
+            self.__task.cancel()
+        else:
+            self.status = TASK_CANCELLED
+
+    def __restart_clock(self):
+        if self.rate:
+            self.__origin = time.perf_counter() - self.events / self.rate
+
+    async def __throttle(self):
+        if self.rate:
+            lag = (self.__origin + self.events / self.rate -
+                   time.perf_counter())
+            if lag > 0:
+                await asyncio.sleep(lag)
+                return
+        if not self.events % self.__batch_size:
+            await asyncio.sleep(0)
+
+    async def run(self):
+        """
+        Handles the events until the steps end
+        """
+        if self.status == TASK_CANCELLED:
+            return
+        self.__task = asyncio.current_task()
+        self.status = TASK_RUNNING
+        self.__restart_clock()
+        try:
+            for event in self.__steps:
+                if self.__paused and not self.__step_budget:
+                    self.status = TASK_PAUSED
+                    while self.__paused and not self.__step_budget:
+                        self.__wakeup.clear()
+                        await self.__wakeup.wait()
+                    self.status = TASK_RUNNING
+                    self.__restart_clock()
+                if self.__paused:
+                    self.__step_budget -= 1
+                self.__callback(event)
+                self.events += 1
+                await self.__throttle()
+            self.status = TASK_FINISHED
+        except asyncio.CancelledError:
+            self.status = TASK_CANCELLED
+        except Exception as exception:
+            self.status = TASK_FAILED
+            self.error = exception
+        finally:
+            close = getattr(self.__steps, 'close', None)
+            if close is not None:
+                close()
+            if self.__on_done is not None:
+                self.__on_done(self)
+
+
+class StepScheduler:
+    """
+    Interleaves the stepping sorts in one thread with asyncio
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.tasks = []
+        self.__batch_size = batch_size
+
+    def add(self, name: str, steps: Steps,
+            callback: typing.Callable[[Event], None], rate=None,
+            on_done: typing.Callable[[SortTask], None] = None) -> SortTask:
+        task = SortTask(name, steps, callback, rate, on_done,
+                        self.__batch_size)
+        self.tasks.append(task)
+        return task
+
+    def pause(self):
+        for task in self.tasks:
+            task.pause()
+
+    def resume(self):
+        for task in self.tasks:
+            task.resume()
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    async def run(self) -> typing.List[SortTask]:
+        """
+        Runs all the tasks until every one of them ends
+        """
+        await asyncio.gather(*(task.run() for task in self.tasks))
+        return self.tasks
+
+
+def _apply_event(pane, event: Event):
+    op, index, value = event
+    if op == OP_COMPARE:
+        pane.apply((OP_READ, OP_READ), (index, value),
+                   (pane.list[index], pane.list[value]))
+    else:
+        pane.apply((op,), (index,), (value,))
+
+
+def _finish_pane(pane, start_time, task: SortTask):
+    pane.finish_time = time.perf_counter() - start_time
+    if task.status == TASK_FINISHED:
+        pane.restore_accessed()
+        pane.paint_sorted()
+    else:
+        pane.error = task.error or asyncio.CancelledError()
+
+
+async def _run_stepping_race(algorithms, script, lst, rows, maximum,
+                             pane_width, delay, sink, fps, ansi):
+    frame_interval = 1 / (fps or DEFAULT_FPS)
+    compositor = RaceCompositor(algorithms, lst, pane_width, rows, maximum,
+                                sink, ansi)
+    compositor.first_print()
+    scheduler = StepScheduler()
+    start_time = time.perf_counter()
+    for pane in compositor.panes:
+        steps = load_stepping_function(pane.name, script)(list(lst))
+        scheduler.add(pane.name, steps, functools.partial(_apply_event, pane),
+                      1 / delay if delay else None,
+                      functools.partial(_finish_pane, pane, start_time))
+    sorting = asyncio.ensure_future(scheduler.run())
+    try:
+        while not sorting.done():
+            compositor.draw()
+            await asyncio.wait({sorting}, timeout=frame_interval)
+    finally:
+        scheduler.cancel()
+    compositor.draw()
+    sink.flush()
+    return compositor.panes
+
+
+def run_stepping_race(algorithms: typing.List[str], script, lst, rows,
+                      maximum, pane_width, delay, sink, fps=None, ansi=True):
+    """
+    Same as race.run_race, but the algorithms are stepping sorts interleaved
+    by the StepScheduler in this process instead of worker processes. Every
+    access costs the delay
+    :return: List of the panes with their finish times, in the order of
+    the algorithms
+    """
+    return asyncio.run(_run_stepping_race(algorithms, script, lst, rows,
+                                          maximum, pane_width, delay, sink,
+                                          fps, ansi))
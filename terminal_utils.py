@@ -1,7 +1,8 @@
 import os
 import shutil
+import signal
 
-from singleton import CallSingleton
+from singleton import CallSingleton, Singleton
 
 try:
     import colorama
@@ -39,3 +40,40 @@ def clear_terminal():
 
 def move_cursor_to_start():
     _MoveCursorToStart()()
+
+
+class ResizeWatcher(Singleton):
+    """
+    Catches terminal resizing with the SIGWINCH signal, so checking for a
+    resizing is a flag test instead of a terminal size request
+    """
+    _installed = False
+    _resized = False
+
+    @classmethod
+    def _handle_resizing(cls, signum, frame):
+        cls._resized = True
+
+    def install(self) -> bool:
+        """
+        Installs the SIGWINCH handler
+        :return: False if resizing can't be caught with signals on this
+        platform or outside of the main thread
+        """
+        if not self._installed:
+            if not hasattr(signal, 'SIGWINCH'):
+                return False
+            try:
+                signal.signal(signal.SIGWINCH, ResizeWatcher._handle_resizing)
+            except ValueError:
+                return False
+            ResizeWatcher._installed = True
+        return True
+
+    def pop_resized(self) -> bool:
+        """
+        Returns True if the terminal was resized since the last call
+        """
+        resized = self._resized
+        ResizeWatcher._resized = False
+        return resized
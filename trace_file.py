@@ -0,0 +1,279 @@
+import argparse
+import array
+import json
+import mmap
+import shutil
+import struct
+import typing
+
+import terminal_utils
+from access_printer_list import choose_access_printer_list_class
+from access_trace import OP_READ, OP_WRITE, AccessTrace
+from binned_list import BinnedList, bin_size
+
+MAGIC = b'TSVTRACE'
+VERSION = 1
+# magic, version, array length, keyframe interval, records count,
+# keyframes count, metadata length
+HEADER = struct.Struct('<8sHIIQQI')
+# op, index, value
+RECORD = struct.Struct('<B3xIq')
+# position of the first record after the snapshot
+KEYFRAME_POSITION = struct.Struct('<Q')
+VALUE_TYPECODE = 'q'
+
+DEFAULT_KEYFRAME_INTERVAL = 4096
+
+# The text will be formatted by argparse
+DESCRIPTION = '''
+Replays an access trace saved with --save-trace. Playback can start from any
+position: the array is restored from the nearest keyframe instead of
+re-running the trace from the start. The bin, full screen and subcell modes
+the trace was saved with are restored as well
+'''
+START_HELP = 'Index of the first access to replay. By default is 0'
+STOP_HELP = '''
+Index after the last access to replay. By default the trace is replayed to
+the end
+'''
+DELAY_HELP = 'Delay in ms after printing one frame. By default is 1 ms'
+FPS_HELP = 'Coalesce accesses and print at most FPS frames per second'
+NO_COLORAMA_HELP = 'Disables the use of colorama, even if it is installed'
+INFO_HELP = 'Print the trace header and metadata instead of replaying'
+
+
+class TraceFileError(Exception):
+    pass
+
+
+def save_trace(path: str, trace: AccessTrace,
+               keyframe_interval: typing.Optional[int] = None,
+               metadata: typing.Optional[dict] = None):
+    """
+    Saves the trace in the binary format: the header, JSON metadata, the
+    initial array, fixed-width records and full array snapshots taken
+    before every keyframe_interval-th record
+    :param keyframe_interval: By default DEFAULT_KEYFRAME_INTERVAL or the
+    array length if it's greater, so the snapshots of large arrays take at
+    most half as many bytes as the records
+    """
+    metadata_bytes = json.dumps(metadata or {}).encode()
+    state = array.array(VALUE_TYPECODE, trace.initial)
+    if keyframe_interval is None:
+        keyframe_interval = max(DEFAULT_KEYFRAME_INTERVAL, len(state))
+    keyframes_count = (len(trace) - 1) // keyframe_interval if trace else 0
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(state), keyframe_interval,
+                               len(trace), keyframes_count,
+                               len(metadata_bytes)))
+        file.write(metadata_bytes)
+        file.write(state.tobytes())
+        pack = RECORD.pack
+        file.writelines(pack(op, index, value)
+                        for op, index, value in trace)
+        for position, (op, index, value) in enumerate(trace, 1):
+            if op == OP_WRITE:
+                state[index] = value
+            if position % keyframe_interval == 0 and position < len(trace):
+                file.write(KEYFRAME_POSITION.pack(position))
+                file.write(state.tobytes())
+
+
+class TraceFile:
+    """
+    Trace file opened with mmap
+    """
+
+    def __init__(self, path: str):
+        self.__file = open(path, 'rb')
+        try:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise TraceFileError(f'{path} is empty')
+        if len(self.__mmap) < HEADER.size:
+            self.close()
+            raise TraceFileError(f'{path} is not a trace file')
+        (magic, version, self.length, self.keyframe_interval,
+         self.records_count, self.keyframes_count,
+         metadata_length) = HEADER.unpack_from(self.__mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise TraceFileError(f'{path} is not a trace file of version '
+                                 f'{VERSION}')
+        offset = HEADER.size
+        self.metadata = json.loads(
+            self.__mmap[offset:offset + metadata_length]
+        )
+        self.__initial_offset = offset + metadata_length
+        self.__snapshot_size = self.length * struct.calcsize(VALUE_TYPECODE)
+        self.__records_offset = self.__initial_offset + self.__snapshot_size
+        self.__keyframes_offset = (self.__records_offset +
+                                   self.records_count * RECORD.size)
+        expected_size = self.__keyframes_offset + self.keyframes_count * (
+            KEYFRAME_POSITION.size + self.__snapshot_size
+        )
+        if len(self.__mmap) != expected_size:
+            self.close()
+            raise TraceFileError(f'{path} is truncated or corrupted')
+
+    def __len__(self):
+        return self.records_count
+
+    def __snapshot(self, offset) -> typing.List[int]:
+        snapshot = array.array(VALUE_TYPECODE)
+        snapshot.frombytes(self.__mmap[offset:offset + self.__snapshot_size])
+        return snapshot.tolist()
+
+    def records(self, start=0, stop=None):
+        """
+        Iterates over the (op, index, value) records in [start, stop)
+        """
+        stop = self.records_count if stop is None else min(
+            stop, self.records_count
+        )
+        if start >= stop:
+            return iter(())
+        return RECORD.iter_unpack(
+            self.__mmap[self.__records_offset + start * RECORD.size:
+                        self.__records_offset + stop * RECORD.size]
+        )
+
+    def state_at(self, position: int) -> typing.List[int]:
+        """
+        Returns the array before the record at the position, starting from
+        the nearest preceding keyframe
+        """
+        position = max(min(position, self.records_count), 0)
+        keyframe = min(position // self.keyframe_interval,
+                       self.keyframes_count)
+        if keyframe:
+            offset = self.__keyframes_offset + (keyframe - 1) * (
+                KEYFRAME_POSITION.size + self.__snapshot_size
+            )
+            keyframe_position, = KEYFRAME_POSITION.unpack_from(self.__mmap,
+                                                               offset)
+            state = self.__snapshot(offset + KEYFRAME_POSITION.size)
+        else:
+            keyframe_position = 0
+            state = self.__snapshot(self.__initial_offset)
+        for op, index, value in self.records(keyframe_position, position):
+            if op == OP_WRITE:
+                state[index] = value
+        return state
+
+    def close(self):
+        self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _create_parser():
+    parser = argparse.ArgumentParser(prog='replay', description=DESCRIPTION)
+    parser.add_argument('path', help='Path to the trace file')
+    parser.add_argument('--start', default=0, type=int, help=START_HELP,
+                        dest='start')
+    parser.add_argument('--stop', type=int, help=STOP_HELP, dest='stop')
+    parser.add_argument('--delay', '-d', default=1, type=float,
+                        help=DELAY_HELP, dest='delay')
+    parser.add_argument('--fps', type=float, help=FPS_HELP, dest='fps')
+    parser.add_argument('--no-colorama', '-c', help=NO_COLORAMA_HELP,
+                        dest='no_colorama', action='store_true')
+    parser.add_argument('--info', help=INFO_HELP, dest='info',
+                        action='store_true')
+    return parser
+
+
+def _create_access_printer_list(state, metadata: dict, delay, fps):
+    """
+    Creates the list which replays the accesses with the display settings
+    the trace was saved with: the bin mode, the full screen and the subcell
+    mode
+    :raise ValueError: If the saved bin mode is unknown
+    """
+    access_printer_list_class = choose_access_printer_list_class()
+    subcell = bool(metadata.get('subcell'))
+    if not metadata.get('bin'):
+        return access_printer_list_class(state, delay, fps, subcell=subcell)
+    columns, rows = bin_size(shutil.get_terminal_size(),
+                             bool(metadata.get('full_screen')), subcell)
+    return BinnedList(
+        state, columns, rows, metadata['bin'],
+        lambda heights, maximum: access_printer_list_class(
+            heights, delay, fps, None, maximum, subcell
+        )
+    )
+
+
+def main(argv=None):
+    """
+    Entry point of the replay subcommand
+    """
+    args = _create_parser().parse_args(argv)
+    try:
+        trace_file = TraceFile(args.path)
+    except FileNotFoundError:
+        print(f'Error. File {args.path} not found')
+        return
+    except TraceFileError as exception:
+        print(f'Error. {exception}')
+        return
+
+    with trace_file:
+        if args.info:
+            print(json.dumps({
+                'length': trace_file.length,
+                'records': trace_file.records_count,
+                'keyframe_interval': trace_file.keyframe_interval,
+                'keyframes': trace_file.keyframes_count,
+                'metadata': trace_file.metadata,
+            }))
+            return
+        if not 0 <= args.start <= len(trace_file):
+            print(f'Error. --start must be between 0 and {len(trace_file)}')
+            return
+        if not args.delay >= 0:
+            print('Error. --delay must be at least zero')
+            return
+        if args.fps is not None and not args.fps > 0:
+            print('Error. --fps must be greater than 0')
+            return
+
+        if args.no_colorama:
+            terminal_utils.colorama = None
+        if terminal_utils.colorama:
+            terminal_utils.colorama.init()
+
+        try:
+            access_printer_list = _create_access_printer_list(
+                trace_file.state_at(args.start), trace_file.metadata,
+                args.delay / 1000, args.fps
+            )
+        except ValueError as exception:
+            print(f'Error. {exception}')
+            return
+        try:
+            for op, index, value in trace_file.records(args.start,
+                                                       args.stop):
+                if op == OP_READ:
+                    access_printer_list[index]
+                else:
+                    access_printer_list[index] = value
+            if args.stop is None or args.stop >= len(trace_file):
+                access_printer_list.end_of_sort()
+            else:
+                access_printer_list.finish()
+        except KeyboardInterrupt:
+            terminal_utils.clear_terminal()
+            print('Error. Program execution was interrupted')
+            return
+        if terminal_utils.colorama:
+            print(terminal_utils.colorama.Back.RESET +
+                  terminal_utils.colorama.Fore.RESET)
+        print()